@@ -0,0 +1,57 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+
+class AsyncRunner:
+    """
+    A process-wide event loop on a background thread, for calling async code
+    from synchronous Streamlit scripts.
+
+    Each script run happens on its own thread without a loop, and creating one
+    per call with asyncio.run() would tie async clients to a loop that is
+    closed straight away. Submitting everything to one long-lived loop lets
+    many sessions' generations be in flight at once on a single thread.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="async-runner", daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the shared loop and wait for its result."""
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Timed out or interrupted: don't leave the coroutine running unattended
+            future.cancel()
+            raise
+
+    def iterate(self, agen: AsyncIterator[Any]) -> Iterator[Any]:
+        """Consume an async generator from synchronous code, one item at a time."""
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            # Also runs when the caller stops early, so the model stream is closed
+            aclose = getattr(agen, "aclose", None)
+            if aclose is not None:
+                self.run(aclose())
+
+
+# Shared by every session in the process; the loop thread starts on first use
+runner = AsyncRunner()
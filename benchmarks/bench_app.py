@@ -0,0 +1,66 @@
+"""Full main.py script reruns for both view modes via Streamlit's AppTest harness."""
+import os
+from typing import Dict
+
+from benchmarks.harness import measure
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+VIEW_MODES = {"two_column": "Two Column View", "carousel": "Carousel View"}
+DECK_SIZE = 10
+
+
+def _button(app, label: str):
+    return next(button for button in app.button if button.label == label)
+
+
+def _click(app, label: str) -> None:
+    _button(app, label).click().run()
+    # A click that raised would otherwise be timed as if it had worked
+    assert not app.exception, app.exception
+
+
+def _loaded_app(view_mode: str):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=60)
+    app.run()
+    app.sidebar.radio[0].set_value(view_mode)
+    app.sidebar.selectbox[2].set_value(DECK_SIZE)
+    app.run()
+    _button(app, "Show Me Flash Cards").click().run()
+    assert not app.exception, app.exception
+    return app
+
+
+def run(repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for name, view_mode in VIEW_MODES.items():
+        results[f"first_render_{name}"] = measure(
+            lambda: _first_render(view_mode), max(3, repeat // 4), warmup=1
+        )
+        app = _loaded_app(view_mode)
+        results[f"rerun_with_deck_{name}"] = measure(app.run, repeat)
+
+    # Interaction reruns: revealing answers and paging through the carousel
+    app = _loaded_app(VIEW_MODES["two_column"])
+    results["click_reveal_two_column"] = measure(
+        lambda: _click(app, "Click Me to reveal answer"),
+        min(repeat, DECK_SIZE), warmup=0
+    )
+    app = _loaded_app(VIEW_MODES["carousel"])
+    results["click_next_carousel"] = measure(lambda: _next_or_previous(app), repeat)
+    return results
+
+
+def _first_render(view_mode: str) -> None:
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP_PATH, default_timeout=60)
+    app.run()
+    app.sidebar.radio[0].set_value(view_mode).run()
+
+
+def _next_or_previous(app) -> None:
+    # Bounce back from the last card so any number of clicks is possible
+    labels = [button.label for button in app.button]
+    _click(app, "Next →" if "Next →" in labels else "← Previous")
@@ -0,0 +1,39 @@
+"""Cold and warm lookups through data.get_cached_certification_data."""
+from typing import Dict
+
+from benchmarks.harness import measure
+
+DECK_SIZE = 10
+
+
+def run(repeat: int) -> Dict[str, Dict[str, float]]:
+    import data
+
+    keys = [
+        (certification, domain)
+        for certification, domains in data.CERTIFICATION_DOMAINS.items()
+        for domain in domains
+    ]
+
+    def cold() -> None:
+        # Every lookup misses, generates from the instant mock and writes to SQLite
+        data.certification_cache.clear()
+        for certification, domain in keys:
+            data.get_cached_certification_data(certification, domain, DECK_SIZE)
+
+    def warm() -> None:
+        for certification, domain in keys:
+            data.get_cached_certification_data(certification, domain, DECK_SIZE)
+
+    def warm_slice() -> None:
+        # Smaller decks are served by slicing the cached larger one
+        for certification, domain in keys:
+            data.get_cached_certification_data(certification, domain, 3)
+
+    results = {
+        f"cold_{len(keys)}_domains": measure(cold, max(3, repeat // 4)),
+    }
+    cold()
+    results[f"warm_{len(keys)}_domains"] = measure(warm, repeat)
+    results[f"warm_slice_{len(keys)}_domains"] = measure(warm_slice, repeat)
+    return results
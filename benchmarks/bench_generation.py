@@ -0,0 +1,25 @@
+"""Sequential vs. concurrent GeminiService.get_certification_content."""
+from typing import Dict
+
+from benchmarks.harness import measure
+from gemini_service import GeminiService
+from model_backends import MockModel
+
+CERTIFICATION = "Benchmark Certification"
+
+
+def run(repeat: int) -> Dict[str, Dict[str, float]]:
+    # Fixed latency so the comparison reflects scheduling, not model noise
+    model = MockModel(latency_mean=0.05, per_card_latency=0.005)
+    service = GeminiService(model=model)
+    # Rate limiting would dominate the measurement; this benchmark is about fan-out
+    service.model.rate_limiter = None
+    runs = max(3, repeat // 4)
+    return {
+        "content_sequential": measure(
+            lambda: service.get_certification_content(CERTIFICATION, 5, max_workers=1), runs
+        ),
+        "content_concurrent": measure(
+            lambda: service.get_certification_content(CERTIFICATION, 5, max_workers=8), runs
+        ),
+    }
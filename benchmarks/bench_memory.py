@@ -0,0 +1,162 @@
+"""
+Per-session memory of the flash card views: session-owned card lists versus
+shared decks from the deck registry.
+
+Before, every session kept its own copy of the deck's card dicts, the card
+HTML built from them and a set of "card_{i}" strings for revealed answers.
+Now a session keeps a deck id, a cursor and a reveal bitmap, and each deck
+(with its HTML) is held once per process. Sessions are spread over --decks
+distinct decks; allocations are counted with tracemalloc.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_memory --sessions 100 1000 5000 --decks 10 --deck-size 25
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.run import BENCHMARK_DIR, configure_environment
+
+CERTIFICATION = "AWS Certified AI Practitioner"
+
+
+def _allocated(build: Callable[[], Any]) -> Tuple[Any, int]:
+    """Run build and return its result with the bytes it left allocated."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = build()
+        gc.collect()
+        return result, tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+
+def _card_html(cards) -> List[Tuple[str, str]]:
+    # Same markup as main.build_card_html, which can't be imported outside a Streamlit run
+    return [
+        (
+            f"""
+            <div class="card question-card">
+                {card['question']}
+            </div>
+            """,
+            f"""
+            <div class="card answer-card">
+                {card['answer']}
+            </div>
+            """
+        )
+        for card in cards
+    ]
+
+
+def _revealed(rng: random.Random, deck_size: int) -> List[int]:
+    """Card numbers (1-based) a learner has revealed so far."""
+    return sorted(rng.sample(range(1, deck_size + 1), rng.randint(0, deck_size)))
+
+
+def measure_level(sessions: int, decks: List[List[Dict[str, str]]], seed: int) -> Dict:
+    from decks import DeckRegistry
+
+    # Decks as they come out of the card cache: JSON, deserialized per lookup
+    cached = [json.dumps(cards) for cards in decks]
+
+    def legacy_sessions() -> List[Dict]:
+        rng = random.Random(seed)
+        states = []
+        for i in range(sessions):
+            cards = json.loads(cached[i % len(cached)])
+            states.append({
+                "cards": cards,
+                "card_html": _card_html(cards),
+                "revealed_answers": {f"card_{n}" for n in _revealed(rng, len(cards))},
+                "current_card_index": rng.randrange(len(cards)),
+            })
+        return states
+
+    def shared_decks() -> Tuple[DeckRegistry, Dict[str, tuple]]:
+        registry = DeckRegistry(max_decks=len(decks))
+        html = {}
+        for cards in cached:
+            deck = registry.register(CERTIFICATION, "Domain", json.loads(cards))
+            html[deck.deck_id] = tuple(_card_html(deck))
+        return registry, html
+
+    registry_and_html, shared_bytes = _allocated(shared_decks)
+    deck_ids = list(registry_and_html[1])
+
+    def shared_sessions() -> List[Dict]:
+        rng = random.Random(seed)
+        states = []
+        for i in range(sessions):
+            deck = registry_and_html[0].get(deck_ids[i % len(deck_ids)])
+            revealed = 0
+            for n in _revealed(rng, len(deck)):
+                revealed |= 1 << (n - 1)
+            states.append({
+                "deck_id": deck.deck_id,
+                "revealed": revealed,
+                "current_card_index": rng.randrange(len(deck)),
+            })
+        return states
+
+    legacy, legacy_bytes = _allocated(legacy_sessions)
+    del legacy
+    shared, session_bytes = _allocated(shared_sessions)
+    del shared
+
+    return {
+        "sessions": sessions,
+        "legacy_bytes_per_session": round(legacy_bytes / sessions),
+        "session_bytes_per_session": round(session_bytes / sessions),
+        "shared_deck_bytes": shared_bytes,
+        # What each session costs once the shared decks are spread over all of them
+        "shared_bytes_per_session": round((session_bytes + shared_bytes) / sessions),
+        "legacy_total_mb": round(legacy_bytes / 2 ** 20, 2),
+        "shared_total_mb": round((session_bytes + shared_bytes) / 2 ** 20, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-session memory of session-owned and shared decks.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[100, 1000, 5000],
+                        help="concurrent session counts to measure")
+    parser.add_argument("--decks", type=int, default=10, help="distinct decks the sessions are studying")
+    parser.add_argument("--deck-size", type=int, default=25, help="cards per deck")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join(BENCHMARK_DIR, "memory_results.json"))
+    args = parser.parse_args()
+
+    configure_environment()
+    from gemini_service import GeminiService
+    from model_backends import MockModel
+
+    service = GeminiService(model=MockModel(seed=args.seed))
+    service.model.rate_limiter = None
+    decks = [service.generate_flashcards(CERTIFICATION, f"Domain {i + 1}", args.deck_size) for i in range(args.decks)]
+
+    print(f"\n{'sessions':>9} {'legacy B/session':>17} {'shared B/session':>17} "
+          f"{'legacy total':>13} {'shared total':>13} {'saving':>7}")
+    levels = []
+    for sessions in args.sessions:
+        level = measure_level(sessions, decks, args.seed)
+        levels.append(level)
+        saving = 1 - level["shared_bytes_per_session"] / level["legacy_bytes_per_session"]
+        print(f"{sessions:>9} {level['legacy_bytes_per_session']:>17} {level['shared_bytes_per_session']:>17} "
+              f"{level['legacy_total_mb']:>11.2f}MB {level['shared_total_mb']:>11.2f}MB {saving:>7.0%}")
+
+    with open(args.output, "w") as f:
+        json.dump({"created_at": time.time(), "decks": args.decks, "deck_size": args.deck_size,
+                   "levels": levels}, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
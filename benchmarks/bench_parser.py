@@ -0,0 +1,32 @@
+"""Q:/A: parser throughput on responses of 3 to 1000 cards."""
+from typing import Dict
+
+from benchmarks.harness import measure
+from gemini_service import FlashcardParser, parse_flashcards
+from model_backends import MockModel
+
+CARD_COUNTS = [3, 10, 100, 1000]
+# Roughly the size of a streamed Gemini chunk
+CHUNK_SIZE = 64
+
+
+def _response_text(num_cards: int) -> str:
+    prompt = f"Create {num_cards} flash cards for the Benchmarking domain of Example certification."
+    return MockModel().generate_content(prompt).text
+
+
+def _parse_streamed(text: str) -> None:
+    parser = FlashcardParser()
+    for i in range(0, len(text), CHUNK_SIZE):
+        parser.feed(text[i:i + CHUNK_SIZE])
+    parser.close()
+
+
+def run(repeat: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for num_cards in CARD_COUNTS:
+        text = _response_text(num_cards)
+        assert len(parse_flashcards(text)) == num_cards
+        results[f"parse_full_{num_cards}_cards"] = measure(lambda: parse_flashcards(text), repeat)
+        results[f"parse_streamed_{num_cards}_cards"] = measure(lambda: _parse_streamed(text), repeat)
+    return results
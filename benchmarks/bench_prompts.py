@@ -0,0 +1,106 @@
+"""
+A/B comparison of the prompt styles in prompts.py: latency, parse success rate
+and token counts per call.
+
+Under benchmarks.run this uses a fixed-latency mock model. Run it directly to
+compare the styles against the backend selected by GEMINI_BACKEND, e.g. the
+real Gemini API:
+    GEMINI_API_KEY=... python -m benchmarks.bench_prompts --repeat 10
+"""
+import argparse
+import os
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+from benchmarks.harness import summarize
+from gemini_client import GenerationError
+from gemini_service import GeminiService, shared_rate_limiter
+from metrics import usage_counts
+from model_backends import MockModel, create_model_backend
+from prompts import PROMPT_STYLES
+
+CERTIFICATION = "AWS Certified AI Practitioner"
+DOMAIN = "Fundamentals of Generative AI"
+CARD_COUNTS = (5, 10, 25)
+
+
+class _UsageRecorder:
+    """Passes calls through to a model, keeping the token counts of each response."""
+
+    def __init__(self, model: Any):
+        self.model = model
+        self.usage: List[tuple] = []
+
+    def generate_content(self, prompt: str, **kwargs: Any) -> Any:
+        response = self.model.generate_content(prompt, **kwargs)
+        self.usage.append(usage_counts(response))
+        return response
+
+
+def _mean(values: List[Optional[int]]) -> Optional[float]:
+    values = [value for value in values if value is not None]
+    return round(statistics.fmean(values), 1) if values else None
+
+
+def compare_styles(model: Any, repeat: int, rate_limited: bool = True) -> Dict[str, Dict[str, float]]:
+    """
+    Time generate_flashcards with each prompt style for every size in CARD_COUNTS.
+    Styles take turns call by call, and waiting for the rate limiter happens
+    before the clock starts, so neither style is charged for the other's quota.
+    """
+    recorders = {style: _UsageRecorder(model) for style in PROMPT_STYLES}
+    services = {style: GeminiService(model=recorders[style], prompt_style=style) for style in PROMPT_STYLES}
+    rate_limiter = shared_rate_limiter if rate_limited else None
+    for service in services.values():
+        service.model.rate_limiter = None
+
+    results = {}
+    for num_cards in CARD_COUNTS:
+        samples: Dict[str, List[float]] = {style: [] for style in PROMPT_STYLES}
+        parsed = dict.fromkeys(PROMPT_STYLES, 0)
+        for recorder in recorders.values():
+            recorder.usage.clear()
+        for _ in range(repeat):
+            for style, service in services.items():
+                if rate_limiter is not None:
+                    rate_limiter.acquire()
+                start = time.perf_counter()
+                try:
+                    cards = service.generate_flashcards(CERTIFICATION, DOMAIN, num_cards)
+                except GenerationError as e:
+                    print(f"  {style} {num_cards} cards failed: {str(e)}")
+                    cards = []
+                samples[style].append((time.perf_counter() - start) * 1000)
+                # A call only counts as parsed if it produced every card asked for
+                parsed[style] += len(cards) == num_cards
+        for style in PROMPT_STYLES:
+            stats = summarize(samples[style])
+            stats["parse_success_rate"] = round(parsed[style] / repeat, 3)
+            stats["prompt_tokens"] = _mean([usage[0] for usage in recorders[style].usage])
+            stats["response_tokens"] = _mean([usage[1] for usage in recorders[style].usage])
+            results[f"flashcards_{num_cards}_{style}"] = stats
+    return results
+
+
+def run(repeat: int) -> Dict[str, Dict[str, float]]:
+    # Fixed latency so differences come from output size, not model noise
+    model = MockModel(latency_mean=0.02, per_card_latency=0.002)
+    return compare_styles(model, max(3, repeat // 4), rate_limited=False)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare prompt styles against the configured model backend.")
+    parser.add_argument("--repeat", type=int, default=5, help="calls per style and deck size")
+    args = parser.parse_args()
+
+    model = create_model_backend(os.getenv('GEMINI_API_KEY'))
+    results = compare_styles(model, args.repeat)
+    print(f"\n{'benchmark':<28} {'median':>10} {'p95':>10} {'parsed':>7} {'prompt tok':>11} {'output tok':>11}")
+    for name, stats in results.items():
+        print(f"{name:<28} {stats['median_ms']:>8.0f}ms {stats['p95_ms']:>8.0f}ms "
+              f"{stats['parse_success_rate']:>7.0%} {str(stats['prompt_tokens']):>11} {str(stats['response_tokens']):>11}")
+
+
+if __name__ == "__main__":
+    main()
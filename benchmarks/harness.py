@@ -0,0 +1,41 @@
+"""Timing helpers shared by the benchmark suites."""
+import gc
+import math
+import statistics
+import time
+from typing import Callable, Dict, List
+
+
+def measure(fn: Callable[[], object], repeat: int = 20, warmup: int = 1) -> Dict[str, float]:
+    """Run fn repeatedly and return timing statistics in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+    finally:
+        if gc_enabled:
+            gc.enable()
+    return summarize(samples)
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted samples, e.g. fraction=0.99 for p99."""
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0], 4),
+        "median_ms": round(statistics.median(ordered), 4),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "p95_ms": round(percentile(ordered, 0.95), 4),
+        "max_ms": round(ordered[-1], 4),
+    }
@@ -0,0 +1,218 @@
+"""
+Concurrent-session load test for main.py against the local mock model.
+
+Each simulated learner is a Streamlit AppTest session driving a scripted flow:
+open the app, pick a view mode, certification, domain and deck size, click
+"Show Me Flash Cards", then reveal answers (Two Column View) or reveal and page
+through cards (Carousel View). All sessions live in this process and share its
+deck registry, caches and card index, as they would share one Streamlit worker.
+
+AppTest is not safe to drive from several threads, so the sessions are
+interleaved on one thread: whichever learner's next interaction is due runs
+next, and its latency is measured from when it was due, so time spent queued
+behind other learners' reruns counts. Reruns therefore never overlap, where a
+real server would run them on parallel threads under the GIL; treat the
+results as the single-worker capacity with no thread switching overhead. For
+each session count the report gives throughput, p50/p99 latency per
+interaction, and this process's CPU use and memory growth. Interactions that
+raised in the app are counted as errors, not timed.
+
+Usage (from the repository root):
+    python -m benchmarks.load_test --sessions 1 5 10 25
+    python -m benchmarks.load_test --sessions 10 --profile slow-tail --cards 5 --cold
+"""
+import argparse
+import heapq
+import json
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from benchmarks.harness import percentile
+from benchmarks.run import BENCHMARK_DIR, configure_environment
+
+APP_PATH = os.path.join(os.path.dirname(BENCHMARK_DIR), "main.py")
+VIEW_MODES = ["Two Column View", "Carousel View"]
+
+
+def _rss_mb() -> float:
+    """Current resident memory of this process, falling back to the peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+class Session:
+    """One simulated learner, as a sequence of named interactions for the scheduler to run."""
+
+    def __init__(self, seed: int, deck_size: int, cards_to_study: int, think_time: float):
+        self.rng = random.Random(seed)
+        self.deck_size = deck_size
+        self.cards_to_study = cards_to_study
+        self.think_time = think_time
+
+    def pause(self) -> float:
+        """Seconds the learner thinks before their next interaction."""
+        return self.rng.uniform(0, 2 * self.think_time) if self.think_time else 0.0
+
+    def steps(self) -> Iterator[Tuple[str, object]]:
+        """Yield (name, action) pairs; each action reruns the app and returns it."""
+        from streamlit.testing.v1 import AppTest
+
+        app = AppTest.from_file(APP_PATH, default_timeout=300)
+        yield "open_app", app.run
+        view_mode = self.rng.choice(VIEW_MODES)
+        yield "select_view", lambda: app.sidebar.radio[0].set_value(view_mode).run()
+        certification = self.rng.choice(app.selectbox(key="cert_select").options)
+        yield "select_certification", lambda: app.selectbox(key="cert_select").set_value(certification).run()
+        domain = self.rng.choice(app.selectbox(key="domain_select").options)
+        yield "select_domain", lambda: app.selectbox(key="domain_select").set_value(domain).run()
+        app.sidebar.selectbox[2].set_value(self.deck_size)
+        yield "load_deck", lambda: _button(app, "Show Me Flash Cards").click().run()
+
+        for _ in range(min(self.cards_to_study, self.deck_size)):
+            if view_mode == "Two Column View":
+                reveal = _button(app, "Click Me to reveal answer")
+                if reveal is None:
+                    break
+                yield "reveal_answer", reveal.click().run
+            else:
+                reveal = _button(app, "Click to reveal")
+                if reveal is not None:
+                    yield "reveal_answer", reveal.click().run
+                next_card = _button(app, "Next →")
+                if next_card is None:
+                    break
+                yield "next_card", next_card.click().run
+
+
+def _button(app, label: str):
+    return next((button for button in app.button if button.label == label), None)
+
+
+def run_level(sessions: int, args: argparse.Namespace) -> Dict:
+    """Run `sessions` learners at once in this process and summarize their interactions."""
+    learners = [Session(args.seed + i, args.deck_size, args.cards, args.think_time) for i in range(sessions)]
+    samples: Dict[str, List[float]] = {}
+    errors: List[str] = []
+    failures: List[str] = []
+
+    rss_before = _rss_mb()
+    cpu_before = time.process_time()
+    start = time.perf_counter()
+    # (time the learner's next interaction is due, learner number, their remaining steps)
+    due = [(start, i, learner.steps()) for i, learner in enumerate(learners)]
+    heapq.heapify(due)
+    while due:
+        due_at, i, steps = heapq.heappop(due)
+        wait = due_at - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            name, action = next(steps)
+            app = action()
+        except StopIteration:
+            continue
+        except Exception as e:
+            failures.append(repr(e))
+            continue
+        done = time.perf_counter()
+        if app.exception:
+            # A rerun that raised is cheap and says nothing about latency
+            errors.append(f"{name}: {app.exception[0].message}")
+        else:
+            samples.setdefault(name, []).append((done - due_at) * 1000)
+        heapq.heappush(due, (done + learners[i].pause(), i, steps))
+    wall = time.perf_counter() - start
+    cpu = time.process_time() - cpu_before
+
+    interactions = {}
+    for name, values in samples.items():
+        ordered = sorted(values)
+        interactions[name] = {
+            "count": len(ordered),
+            "p50_ms": round(statistics.median(ordered), 1),
+            "p99_ms": round(percentile(ordered, 0.99), 1),
+            "max_ms": round(ordered[-1], 1),
+        }
+    total = sum(len(values) for values in samples.values())
+    rss = _rss_mb()
+    return {
+        "sessions": sessions,
+        "wall_seconds": round(wall, 2),
+        "interactions": total,
+        "throughput_per_second": round(total / wall, 2) if wall else 0.0,
+        # Share of one core; reruns run one at a time, so above 100% is background threads
+        "cpu_percent": round(100 * cpu / wall, 1) if wall else 0.0,
+        "rss_mb": round(rss, 1),
+        "rss_growth_mb": round(rss - rss_before, 1),
+        "errors": len(errors) + len(failures),
+        "error_messages": errors[:5],
+        "failures": failures[:5],
+        "per_interaction": interactions,
+    }
+
+
+def print_report(level: Dict) -> None:
+    print(f"\n{level['sessions']} sessions: {level['interactions']} interactions in {level['wall_seconds']}s, "
+          f"{level['throughput_per_second']}/s, CPU {level['cpu_percent']}%, "
+          f"RSS {level['rss_mb']}MB (+{level['rss_growth_mb']}MB), errors {level['errors']}")
+    for error in level["error_messages"]:
+        print(f"  error: {error}")
+    for failure in level["failures"]:
+        print(f"  failed: {failure}")
+    print(f"  {'interaction':<22} {'count':>6} {'p50':>10} {'p99':>10} {'max':>10}")
+    for name, stats in level["per_interaction"].items():
+        print(f"  {name:<22} {stats['count']:>6} {stats['p50_ms']:>8.1f}ms "
+              f"{stats['p99_ms']:>8.1f}ms {stats['max_ms']:>8.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test main.py with concurrent simulated sessions.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 5, 10, 25],
+                        help="concurrent session counts to test, in order")
+    parser.add_argument("--profile", default="realistic", help="MOCK_GEMINI_PROFILE for the stand-in model")
+    parser.add_argument("--deck-size", type=int, default=10, help="cards per deck (one of DECK_SIZES)")
+    parser.add_argument("--cards", type=int, default=5, help="cards each learner studies after loading")
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="mean seconds a learner pauses before each interaction")
+    parser.add_argument("--cold", action="store_true",
+                        help="empty the card cache before each level so decks are generated again")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join(BENCHMARK_DIR, "load_results.json"))
+    args = parser.parse_args()
+
+    configure_environment()
+    os.environ["MOCK_GEMINI_PROFILE"] = args.profile
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError as e:
+        sys.exit(f"The load test needs streamlit installed: {str(e)}")
+
+    # One untimed run so the first level doesn't pay for importing Streamlit and data.py
+    AppTest.from_file(APP_PATH, default_timeout=300).run()
+
+    levels = []
+    for sessions in args.sessions:
+        print(f"Running {sessions} concurrent sessions...")
+        if args.cold:
+            sys.modules["data"].certification_cache.clear()
+        level = run_level(sessions, args)
+        print_report(level)
+        levels.append(level)
+
+    with open(args.output, "w") as f:
+        json.dump({"created_at": time.time(), "profile": args.profile, "levels": levels}, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Run the benchmark suites against the local mock model and compare with a baseline.
+
+Usage (from the repository root):
+    python -m benchmarks.run                      # run everything, compare with baseline
+    python -m benchmarks.run --only parser cache  # run selected suites
+    python -m benchmarks.run --save-baseline      # store these results as the new baseline
+
+Results are written as JSON. Exits with status 1 when any benchmark's median is
+slower than the baseline by more than --tolerance.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Dict
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SUITES = {
+    "parser": "benchmarks.bench_parser",
+    "cache": "benchmarks.bench_cache",
+    "generation": "benchmarks.bench_generation",
+    "prompts": "benchmarks.bench_prompts",
+    "app": "benchmarks.bench_app",
+}
+
+
+def configure_environment() -> None:
+    """Point data.py at the instant mock model and a throwaway cache before it is imported."""
+    scratch = tempfile.mkdtemp(prefix="whizcards-bench-")
+    os.environ["GEMINI_BACKEND"] = "mock"
+    os.environ["MOCK_GEMINI_PROFILE"] = "instant"
+    os.environ["CARD_CACHE_PATH"] = os.path.join(scratch, "cards.sqlite3")
+    os.environ["CARD_PACK_PATH"] = os.path.join(scratch, "card_pack.bin")
+    os.environ["PROGRESS_DB_PATH"] = os.path.join(scratch, "progress.sqlite3")
+    # Rate limiting would otherwise dominate every cold measurement
+    os.environ["GEMINI_REQUESTS_PER_MINUTE"] = "1000000"
+    os.environ["GEMINI_BURST"] = "1000000"
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> int:
+    """Print a comparison table and return the number of regressions."""
+    regressions = 0
+    print(f"\n{'benchmark':<55} {'baseline':>12} {'current':>12} {'change':>9}")
+    for suite, benchmarks in results.items():
+        for name, stats in benchmarks.items():
+            key = f"{suite}.{name}"
+            previous = baseline.get(suite, {}).get(name)
+            current = stats["median_ms"]
+            if previous is None:
+                print(f"{key:<55} {'-':>12} {current:>10.3f}ms {'new':>9}")
+                continue
+            change = (current - previous["median_ms"]) / previous["median_ms"] if previous["median_ms"] else 0.0
+            flag = ""
+            if change > tolerance:
+                regressions += 1
+                flag = "  REGRESSION"
+            print(f"{key:<55} {previous['median_ms']:>10.3f}ms {current:>10.3f}ms {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run WhizCards benchmarks.")
+    parser.add_argument("--only", nargs="+", choices=list(SUITES), help="suites to run")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per benchmark")
+    parser.add_argument("--output", default=os.path.join(BENCHMARK_DIR, "results.json"))
+    parser.add_argument("--baseline", default=os.path.join(BENCHMARK_DIR, "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="write results to the baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed median slowdown before reporting a regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    configure_environment()
+    results = {}
+    for name in args.only or list(SUITES):
+        print(f"Running {name} benchmarks...")
+        try:
+            # Suites import optional dependencies (e.g. streamlit) lazily inside run()
+            results[name] = importlib.import_module(SUITES[name]).run(args.repeat)
+        except ImportError as e:
+            print(f"  skipped: {str(e)}")
+
+    report = {
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{regressions} benchmark(s) regressed by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
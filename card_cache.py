@@ -0,0 +1,150 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from metrics import cache_events
+
+
+class CardCache:
+    """
+    Persistent card cache backed by SQLite in WAL mode.
+
+    Entries survive restarts and are shared between Streamlit worker processes.
+    Each entry expires after ``ttl_seconds`` and the least recently used entries
+    are evicted once the cache holds more than ``max_entries``. ``name`` labels
+    this cache's events in the metrics.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 2000,
+                 name: str = "cards"):
+        self.path = path
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.evictions = 0
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cards (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cards_accessed_at ON cards (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; SQLite serialises writers across processes for us.
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + amount)
+        cache_events.inc(amount, cache=self.name, event=name)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss or expired entry."""
+        conn = self._connection()
+        row = conn.execute("SELECT value, created_at FROM cards WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None:
+            self._count("misses")
+            return None
+        value, created_at = row
+        if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+            # Expired entries stay until evicted so get_stale() can still serve them
+            self._count("misses")
+            return None
+        conn.execute("UPDATE cards SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count("hits")
+        return json.loads(value)
+
+    def get_with_age(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Return (value, age in seconds) for key, including expired entries, so
+        callers can serve stale values while they refresh them. None on a miss.
+        """
+        conn = self._connection()
+        row = conn.execute("SELECT value, created_at FROM cards WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None:
+            self._count("misses")
+            return None
+        value, created_at = row
+        age = now - created_at
+        conn.execute("UPDATE cards SET accessed_at = ? WHERE key = ?", (now, key))
+        self._count("stale_hits" if self.ttl_seconds is not None and age > self.ttl_seconds else "hits")
+        return json.loads(value), age
+
+    def get_stale(self, key: str) -> Optional[Any]:
+        """Return the value for key even if it has expired, e.g. while Gemini is down."""
+        row = self._connection().execute("SELECT value FROM cards WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store value under key and evict least recently used entries over the limit."""
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cards (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now, now),
+        )
+        self._evict()
+
+    def _evict(self) -> None:
+        conn = self._connection()
+        (count,) = conn.execute("SELECT COUNT(*) FROM cards").fetchone()
+        excess = count - self.max_entries
+        if excess <= 0:
+            return
+        cursor = conn.execute(
+            "DELETE FROM cards WHERE key IN (SELECT key FROM cards ORDER BY accessed_at ASC LIMIT ?)",
+            (excess,),
+        )
+        self._count("evictions", cursor.rowcount)
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cards WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        self._connection().execute("DELETE FROM cards")
+
+    def __contains__(self, key: str) -> bool:
+        row = self._connection().execute("SELECT created_at FROM cards WHERE key = ?", (key,)).fetchone()
+        return row is not None and (self.ttl_seconds is None or time.time() - row[0] <= self.ttl_seconds)
+
+    def __len__(self) -> int:
+        (count,) = self._connection().execute("SELECT COUNT(*) FROM cards").fetchone()
+        return count
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters for this process plus the current entry count."""
+        with self._stats_lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "evictions": self.evictions,
+                "entries": len(self),
+            }
@@ -0,0 +1,99 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Bump when the on-disk layout changes; older packs are then ignored
+CARD_PACK_VERSION = 1
+CARD_PACK_MAGIC = "WHIZCARDS-PACK"
+
+
+def write_card_pack(path: str, decks: Dict[str, Dict[str, List[Dict[str, str]]]],
+                    metadata: Optional[Dict] = None) -> None:
+    """
+    Write pre-generated decks ({certification: {domain: cards}}) to a card pack.
+
+    The file starts with a single JSON header line holding the version and an
+    index of (offset, length) for every deck, followed by each deck's JSON
+    payload. Readers only parse the header up front and decode a deck on demand.
+    The file is written to a temporary path and moved into place atomically.
+    """
+    payloads = []
+    index = {}
+    offset = 0
+    for certification, domains in decks.items():
+        for domain, cards in domains.items():
+            payload = json.dumps(cards, separators=(',', ':')).encode('utf-8')
+            index.setdefault(certification, {})[domain] = [offset, len(payload)]
+            payloads.append(payload)
+            offset += len(payload)
+
+    header = {
+        "magic": CARD_PACK_MAGIC,
+        "version": CARD_PACK_VERSION,
+        "metadata": metadata or {},
+        "index": index,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(json.dumps(header, separators=(',', ':')).encode('utf-8'))
+        f.write(b'\n')
+        for payload in payloads:
+            f.write(payload)
+    os.replace(tmp_path, path)
+
+
+class CardPack:
+    """Read-only view of a card pack that decodes decks lazily on first access."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._decoded: Dict[Tuple[str, str], List[Dict[str, str]]] = {}
+        with open(path, 'rb') as f:
+            header = json.loads(f.readline())
+            self._data_start = f.tell()
+        if header.get("magic") != CARD_PACK_MAGIC or header.get("version") != CARD_PACK_VERSION:
+            raise ValueError(f"Unsupported card pack format in {path}")
+        self.metadata = header.get("metadata", {})
+        self._index = header["index"]
+
+    @classmethod
+    def load(cls, path: str) -> Optional['CardPack']:
+        """Open the pack at path, or return None if it is missing or unreadable."""
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading card pack {path}: {str(e)}")
+            return None
+
+    def get(self, certification: str, domain: str) -> Optional[List[Dict[str, str]]]:
+        """Return the deck for a certification domain, or None if the pack lacks it."""
+        key = (certification, domain)
+        with self._lock:
+            cards = self._decoded.get(key)
+        if cards is not None:
+            return cards
+
+        entry = self._index.get(certification, {}).get(domain)
+        if entry is None:
+            return None
+        offset, length = entry
+        with open(self.path, 'rb') as f:
+            f.seek(self._data_start + offset)
+            cards = json.loads(f.read(length))
+        with self._lock:
+            self._decoded[key] = cards
+        return cards
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        certification, domain = key
+        return domain in self._index.get(certification, {})
+
+    def certifications(self) -> List[str]:
+        return list(self._index)
+
+    def domains(self, certification: str) -> List[str]:
+        return list(self._index.get(certification, {}))
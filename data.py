@@ -1,7 +1,23 @@
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Set
 import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
+from async_runner import runner
+from card_cache import CardCache
+from card_pack import CardPack
+from decks import Deck, DeckRegistry
+from dedup import NearDuplicateIndex
+from domain_catalog import DomainCatalog
+from prefetch import Prefetcher
+from progress_store import ProgressStore
+from search_index import CardSearchIndex
+from single_flight import SingleFlight
+from srs import ReviewScheduler, ReviewState
+from gemini_client import GenerationError, RateLimitDeferred, background_calls, in_background
 from gemini_service import GeminiService
+from metrics import registry, start_exporters
 
 # Predefined domains for each certification
 CERTIFICATION_DOMAINS = {
@@ -49,10 +65,25 @@ CERTIFICATION_DOMAINS = {
     ]
 }
 
+# Share of exam questions per domain (percent), from each exam guide's content outline.
+# Ranges in the guides use their midpoint; certifications not listed weight domains equally.
+EXAM_BLUEPRINT_WEIGHTS = {
+    "AWS Certified AI Practitioner": [20, 24, 28, 14, 14],
+    "Exam AZ-104: Microsoft Azure Administrator": [22.5, 17.5, 22.5, 17.5, 12.5],
+    "NVIDIA-Certified Associate: Generative AI and LLMs": [30, 14, 22, 24, 10],
+    "Google Cloud Certified Cloud Digital Leader": [17, 16, 16, 17, 17, 17],
+    "AWS Certified Data Engineer Associate": [34, 26, 22, 18],
+    "AWS Certified Solutions Architect Associate": [30, 26, 24, 20]
+}
+
 def get_api_key() -> str:
     """Get Gemini API key from either streamlit secrets or environment variable."""
     # First try to get from streamlit secrets
-    api_key = st.secrets.get("GEMINI_API_KEY")
+    try:
+        api_key = st.secrets.get("GEMINI_API_KEY")
+    except FileNotFoundError:
+        # No secrets.toml, e.g. when running outside `streamlit run`
+        api_key = None
     
     # If not in secrets, try environment variable
     if not api_key:
@@ -66,34 +97,673 @@ def get_api_key() -> str:
     
     return api_key
 
-# Initialize Gemini service with API key
-try:
-    gemini_service = GeminiService(get_api_key())
-except ValueError as e:
-    st.error(str(e))
-    st.stop()
+# Process-wide Gemini service, created on the first real generation so that startup
+# and cache hits never pay for the SDK import or client setup (or need an API key)
+_gemini_service: Optional[GeminiService] = None
+_gemini_service_lock = threading.Lock()
+
+def get_gemini_service() -> GeminiService:
+    """Return the shared GeminiService, creating it on first use."""
+    global _gemini_service
+    if _gemini_service is None:
+        with _gemini_service_lock:
+            if _gemini_service is None:
+                try:
+                    # The local mock backend doesn't need an API key
+                    if os.getenv('GEMINI_BACKEND', 'gemini').lower() == 'mock':
+                        _gemini_service = GeminiService()
+                    else:
+                        _gemini_service = GeminiService(get_api_key())
+                except ValueError as e:
+                    raise GenerationError(str(e)) from e
+    return _gemini_service
 
-def get_certification_data(certification_name: str, domain: str, num_cards: int = 5) -> List[Dict[str, str]]:
+def get_certification_data(certification_name: str, domain: str, num_cards: int = 5,
+                           exclude_questions: Optional[List[str]] = None) -> List[Dict[str, str]]:
     """
     Fetch certification data from Gemini API for a specific domain.
     Returns list of flashcards for the specified domain.
     """
-    return gemini_service.generate_flashcards(certification_name, domain, num_cards)
+    return get_gemini_service().generate_flashcards(certification_name, domain, num_cards, exclude_questions)
 
 # List of supported certifications
 SUPPORTED_CERTIFICATIONS = list(CERTIFICATION_DOMAINS.keys())
 
-# Cache for storing generated content to avoid repeated API calls
-certification_cache = {}
+# Deck sizes offered in the sidebar
+DECK_SIZES = [3, 5, 10, 25, 50, 100]
+
+# Largest number of cards asked for in one Gemini call; bigger decks are built in rounds
+MAX_CARDS_PER_REQUEST = 25
+
+# Pre-generated decks built by pregenerate.py; the live Gemini path is only a fallback
+CARD_PACK_PATH = os.getenv(
+    'CARD_PACK_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'card_pack.bin')
+)
+card_pack = CardPack.load(CARD_PACK_PATH)
+
+# Persistent cache for generated content, shared across restarts and worker processes
+CARD_CACHE_PATH = os.getenv(
+    'CARD_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'cards.sqlite3')
+)
+certification_cache = CardCache(
+    CARD_CACHE_PATH,
+    ttl_seconds=float(os.getenv('CARD_CACHE_TTL_SECONDS', 7 * 24 * 3600)),
+    max_entries=int(os.getenv('CARD_CACHE_MAX_ENTRIES', 2000))
+)
+# Expired decks are still served for up to this long past their TTL while a
+# background refresh regenerates them; older ones are regenerated in the foreground
+CARD_CACHE_MAX_STALENESS_SECONDS = float(os.getenv('CARD_CACHE_MAX_STALENESS_SECONDS', 7 * 24 * 3600))
+
+# Domains for certifications beyond CERTIFICATION_DOMAINS are resolved through
+# Gemini once, cached persistently and refreshed in the background once stale
+domain_catalog = DomainCatalog(
+    lambda certification_name: get_gemini_service().get_certification_domains(certification_name),
+    CardCache(
+        os.getenv('DOMAIN_CATALOG_PATH', os.path.join(os.path.dirname(CARD_CACHE_PATH), 'domains.sqlite3')),
+        ttl_seconds=float(os.getenv('DOMAIN_CATALOG_TTL_SECONDS', 30 * 24 * 3600)),
+        max_entries=1000,
+        name="domains"
+    ),
+    CERTIFICATION_DOMAINS,
+    retry_seconds=float(os.getenv('DOMAIN_CATALOG_RETRY_SECONDS', 60))
+)
+# Refresh added certifications whose domains have gone stale before anyone asks for them
+domain_catalog.prefetch(domain_catalog.certifications())
+
+def get_certifications() -> List[str]:
+    """Predefined certifications plus any added by users."""
+    return domain_catalog.certifications()
+
+def get_domains(certification_name: str, wait: bool = True) -> List[str]:
+    """
+    Domains for a certification. Raises GenerationError if an unknown certification
+    can't be resolved; with wait=False it returns [] and resolves in the background.
+    """
+    return domain_catalog.domains(certification_name, wait)
+
+def add_certification(certification_name: str) -> None:
+    domain_catalog.add_certification(certification_name)
+
+# Full-text index over every cached card, stored alongside the card cache
+SEARCH_INDEX_PATH = os.getenv(
+    'SEARCH_INDEX_PATH',
+    os.path.join(os.path.dirname(CARD_CACHE_PATH), 'search.sqlite3')
+)
+search_index = CardSearchIndex(SEARCH_INDEX_PATH)
+
+def _index_card_pack() -> None:
+    for certification_name in card_pack.certifications():
+        for domain in card_pack.domains(certification_name):
+            search_index.add_cards(certification_name, domain, card_pack.get(certification_name, domain) or [])
+
+# Pack decks are searchable too; indexing them is a no-op once done
+if card_pack is not None:
+    threading.Thread(target=_index_card_pack, name="index-card-pack", daemon=True).start()
+
+# Spaced-repetition progress per learner, kept next to the card cache
+PROGRESS_DB_PATH = os.getenv(
+    'PROGRESS_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'progress.sqlite3')
+)
+progress_store = ProgressStore(
+    PROGRESS_DB_PATH,
+    batch_size=int(os.getenv('PROGRESS_BATCH_SIZE', 20)),
+    flush_interval=float(os.getenv('PROGRESS_FLUSH_SECONDS', 10))
+)
+
+# Loaded decks, held once per process however many sessions are studying them
+deck_registry = DeckRegistry(max_decks=int(os.getenv('DECK_REGISTRY_SIZE', 256)))
+
+def register_deck(certification_name: str, domain: str, cards: List[Dict[str, str]]) -> Deck:
+    """The shared, immutable deck for these cards; sessions keep only its deck_id."""
+    return deck_registry.register(certification_name, domain, cards)
+
+def get_deck(deck_id: str) -> Optional[Deck]:
+    """A registered deck, or None if it has been dropped and needs loading again."""
+    return deck_registry.get(deck_id)
+
+def load_deck(deck_id: str, certification_name: str, domain: str, num_cards: int) -> Optional[Deck]:
+    """
+    A session's deck, registered again from the cached cards if it was dropped
+    from the registry; nothing is generated. The rebuilt deck gets a new id if
+    the cached cards have changed since. None if they are no longer cached and
+    the deck has to be loaded again.
+    """
+    deck = deck_registry.get(deck_id)
+    if deck is None:
+        cards = _cached_deck(certification_name, domain)[:num_cards]
+        if len(cards) < num_cards:
+            return None
+        deck = deck_registry.register(certification_name, domain, cards)
+    return deck
+
+# Coalesces concurrent generations of the same deck into a single Gemini call
+generation_flight = SingleFlight()
+
+def _deck_key(certification_name: str, domain: str) -> str:
+    # One deck per domain regardless of size: smaller requests are slices of it
+    return f"{certification_name}_{domain}"
+
+def _exhausted_key(cache_key: str) -> str:
+    return f"{cache_key}#exhausted"
+
+def _is_exhausted(cache_key: str, cards: List[Dict[str, str]]) -> bool:
+    """
+    Whether generation already levelled off at this deck's size: the model kept
+    producing near-duplicates, so asking again would only spend more calls.
+    The marker expires with the cache TTL, after which growing is tried again.
+    """
+    key = _exhausted_key(cache_key)
+    return bool(cards) and key in certification_cache and certification_cache.get_stale(key) == len(cards)
+
+def _mark_exhausted(cache_key: str, cards: List[Dict[str, str]]) -> None:
+    if cards:
+        certification_cache.set(_exhausted_key(cache_key), len(cards))
+
+# Per-deck similarity indexes over the cached questions, so new cards can be
+# checked for near-duplicates without comparing against the whole deck
+_similarity_indexes: Dict[str, NearDuplicateIndex] = {}
+_similarity_lock = threading.Lock()
+
+# Extra generation rounds allowed when near-duplicates leave a deck short
+MAX_GROWTH_ROUNDS = 3
+
+def _similarity_index(cache_key: str, cards: List[Dict[str, str]]) -> NearDuplicateIndex:
+    """The deck's similarity index, rebuilt if it no longer matches the cached deck."""
+    with _similarity_lock:
+        index = _similarity_indexes.get(cache_key)
+        if index is None or len(index) != len(cards):
+            index = NearDuplicateIndex()
+            for card in cards:
+                index.add(card['question'], force=True)
+            _similarity_indexes[cache_key] = index
+        return index
+
+def _add_unique(index: NearDuplicateIndex, cards: List[Dict[str, str]],
+                new_cards: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Append the new cards that aren't near-duplicates to cards; return those added."""
+    added = []
+    for card in new_cards:
+        if index.add(card['question']):
+            cards.append(card)
+            added.append(card)
+    return added
+
+def _store_deck(certification_name: str, domain: str, cards: List[Dict[str, str]]) -> None:
+    """Cache a deck and make its new cards searchable."""
+    certification_cache.set(_deck_key(certification_name, domain), cards)
+    search_index.add_cards(certification_name, domain, cards)
+
+def search_cards(query: str, limit: int = 20, certification_name: Optional[str] = None) -> List[Dict]:
+    """Cards matching query across every certification and domain, best first. No model call."""
+    return search_index.search(query, limit, certification_name)
+
+# Background regeneration of expired decks, one refresh per deck at a time
+_refresh_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('REFRESH_WORKERS', 1)), thread_name_prefix="deck-refresh"
+)
+_refreshing: Set[str] = set()
+_refreshing_lock = threading.Lock()
+
+def _schedule_refresh(certification_name: str, domain: str) -> None:
+    cache_key = _deck_key(certification_name, domain)
+    with _refreshing_lock:
+        if cache_key in _refreshing:
+            return
+        _refreshing.add(cache_key)
+    _refresh_executor.submit(_refresh_deck, certification_name, domain)
+
+def _refresh_deck(certification_name: str, domain: str) -> None:
+    """Replace an expired deck with a freshly generated one of the same size."""
+    cache_key = _deck_key(certification_name, domain)
+    try:
+        stale = certification_cache.get_stale(cache_key) or []
+        # Like prefetches, refreshes must not wait on or drain the rate limit ahead of users
+        with background_calls(reserve=PREFETCH_TOKEN_RESERVE):
+            cards = generate_unique_deck(certification_name, domain, max(len(stale), 1))
+        entry = certification_cache.get_with_age(cache_key)
+        # A deck grown in the foreground meanwhile is already fresh; don't shrink it
+        if entry is not None and entry[1] <= certification_cache.ttl_seconds:
+            return
+        if len(cards) < len(stale):
+            print(f"Kept stale deck for {domain}: refresh only produced {len(cards)} of {len(stale)} cards")
+            return
+        with _similarity_lock:
+            _similarity_indexes.pop(cache_key, None)
+        _store_deck(certification_name, domain, cards)
+    except RateLimitDeferred:
+        # The stale deck stays in place and is refreshed again on a later request
+        print(f"Deferred refreshing {domain}: no rate limit to spare")
+    except GenerationError as e:
+        # The stale deck stays in place and is refreshed again on a later request
+        print(f"Error refreshing {domain}: {str(e)}")
+    finally:
+        with _refreshing_lock:
+            _refreshing.discard(cache_key)
+
+def _cached_deck(certification_name: str, domain: str) -> List[Dict[str, str]]:
+    """
+    The largest deck we have without calling Gemini: the cached deck or the card
+    pack's, whichever holds more cards, so a small deck cached before the pack was
+    built doesn't send larger requests to Gemini. An expired deck is returned as
+    is and refreshed in the background, unless it is past the max-staleness bound.
+    """
+    cards = None
+    expired = False
+    entry = certification_cache.get_with_age(_deck_key(certification_name, domain))
+    if entry is not None:
+        cards, age = entry
+        ttl = certification_cache.ttl_seconds
+        if ttl is not None and age > ttl:
+            if age <= ttl + CARD_CACHE_MAX_STALENESS_SECONDS:
+                expired = True
+            else:
+                cards = None
+    if card_pack is not None:
+        packed = card_pack.get(certification_name, domain)
+        if packed and len(packed) > len(cards or ()):
+            cards, expired = packed, False
+    # Only the deck we serve is worth regenerating
+    if expired:
+        _schedule_refresh(certification_name, domain)
+    # Copy so growing the deck never mutates the pack's decoded entry
+    return list(cards or [])
 
 def get_cached_certification_data(certification_name: str, domain: str, num_cards: int = 5) -> List[Dict[str, str]]:
     """
     Get certification data with caching to minimize API calls.
+    Smaller requests are served from a larger cached deck, and a deck that is
+    too small is topped up with only the missing cards. Concurrent misses for
+    the same deck share one generation.
+    """
+    cache_key = _deck_key(certification_name, domain)
+    cards = _cached_deck(certification_name, domain)
+    if len(cards) >= num_cards or _is_exhausted(cache_key, cards):
+        return cards[:num_cards]
+    try:
+        # A second round covers joining a concurrent leader that grew the deck to a
+        # smaller size; a caller that led the generation itself got all there is
+        for _ in range(2):
+            try:
+                cards, led = generation_flight.call(
+                    cache_key, lambda: _grow_deck(cache_key, certification_name, domain, num_cards)
+                )
+            except RateLimitDeferred:
+                if in_background():
+                    raise
+                # We joined a prefetch that gave way to foreground requests; grow the deck ourselves
+                cards, led = _cached_deck(certification_name, domain), False
+            if led or len(cards) >= num_cards or _is_exhausted(cache_key, cards):
+                break
+    except GenerationError as e:
+        cards = _fallback_deck(certification_name, domain, cards, e)
+    return cards[:num_cards]
+
+def _fallback_deck(certification_name: str, domain: str, cards: List[Dict[str, str]],
+                   error: GenerationError) -> List[Dict[str, str]]:
+    """
+    Best deck to serve when generation failed: an expired cache entry or the
+    partial deck we already have. Re-raises error if there is nothing at all.
+    """
+    stale = certification_cache.get_stale(_deck_key(certification_name, domain)) or []
+    fallback = stale if len(stale) > len(cards) else cards
+    if not fallback:
+        raise error
+    print(f"Serving {len(fallback)} cached cards for {domain} after generation failed: {str(error)}")
+    return fallback
+
+def _grow_deck(cache_key: str, certification_name: str, domain: str, num_cards: int) -> List[Dict[str, str]]:
+    # Another caller may have grown the deck while we waited to lead
+    cards = _cached_deck(certification_name, domain)
+    if len(cards) >= num_cards or _is_exhausted(cache_key, cards):
+        return cards
+    index = _similarity_index(cache_key, cards)
+    cached_count = len(cards)
+    try:
+        _generate_unique(certification_name, domain, cards, index, num_cards)
+    except GenerationError:
+        # Keep the unique cards from earlier rounds before giving up
+        if len(cards) > cached_count:
+            _store_deck(certification_name, domain, cards)
+        raise
+    # Don't persist failed generations, so the next request retries
+    if len(cards) > cached_count:
+        _store_deck(certification_name, domain, cards)
+    if len(cards) < num_cards:
+        _mark_exhausted(cache_key, cards)
+    return cards
+
+def _generate_unique(certification_name: str, domain: str, cards: List[Dict[str, str]],
+                     index: NearDuplicateIndex, num_cards: int) -> None:
+    """
+    Grow cards in place to num_cards unique cards. Each round asks for at most
+    MAX_CARDS_PER_REQUEST cards with every known question excluded; near-duplicates
+    are dropped, and up to MAX_GROWTH_ROUNDS extra rounds make up for them.
+    Stops early once a round adds nothing new, as the deck has levelled off.
+    """
+    rounds = -(-(num_cards - len(cards)) // MAX_CARDS_PER_REQUEST) + MAX_GROWTH_ROUNDS
+    for _ in range(rounds):
+        if len(cards) >= num_cards:
+            break
+        new_cards = get_certification_data(
+            certification_name, domain, min(num_cards - len(cards), MAX_CARDS_PER_REQUEST),
+            exclude_questions=[card['question'] for card in cards] or None
+        )
+        if not _add_unique(index, cards, new_cards):
+            break
+
+def generate_unique_deck(certification_name: str, domain: str, num_cards: int) -> List[Dict[str, str]]:
+    """Generate a fresh deck of num_cards unique cards without touching the cache."""
+    cards: List[Dict[str, str]] = []
+    _generate_unique(certification_name, domain, cards, NearDuplicateIndex(), num_cards)
+    return cards
+
+def prefill_certification_cache(certification_name: str, domains: Optional[List[str]] = None,
+                                num_cards: int = 5) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Fill the cache for many domains of a certification with one batched Gemini call.
+    Only domains whose cached deck is smaller than num_cards are requested.
+    Returns cards for every domain that is now cached.
+    """
+    if domains is None:
+        domains = get_domains(certification_name)
+
+    content = {}
+    short = {}
+    for domain in domains:
+        cards = _cached_deck(certification_name, domain)
+        if len(cards) >= num_cards:
+            content[domain] = cards[:num_cards]
+        else:
+            short[domain] = cards
+
+    if short:
+        generated = get_gemini_service().generate_flashcards_batch(certification_name, list(short), num_cards)
+        for domain, new_cards in generated.items():
+            content[domain] = _merge_into_deck(certification_name, domain, new_cards)[:num_cards]
+    return content
+
+def _merge_into_deck(certification_name: str, domain: str, new_cards: List[Dict[str, str]]) -> List[Dict[str, str]]:
     """
-    cache_key = f"{certification_name}_{domain}_{num_cards}"
-    if cache_key not in certification_cache:
-        certification_cache[cache_key] = get_certification_data(certification_name, domain, num_cards)
-    return certification_cache[cache_key]
+    Add separately generated cards to a domain's cached deck and return the deck.
+    The read-merge-write runs as the deck's flight, so it can't interleave with a
+    concurrent grow or stream of the same deck and drop its cards; if one is in
+    flight, we wait for it and merge into the deck it stored.
+    """
+    cache_key = _deck_key(certification_name, domain)
+
+    def merge() -> List[Dict[str, str]]:
+        cards = _cached_deck(certification_name, domain)
+        if _add_unique(_similarity_index(cache_key, cards), cards, new_cards):
+            _store_deck(certification_name, domain, cards)
+        return cards
+
+    while True:
+        try:
+            cards, led = generation_flight.call(cache_key, merge)
+        except GenerationError:
+            # The flight we joined failed; the deck is ours to merge into now
+            continue
+        if led:
+            return cards
+
+# Default length of a mock exam, as in most associate-level exams
+MOCK_EXAM_SIZE = 65
+
+# Most cards asked for in one batched call when filling gaps for a mock exam
+EXAM_BATCH_CARDS = 30
+
+def exam_allocation(certification_name: str, domains: List[str], num_questions: int) -> Dict[str, int]:
+    """Questions per domain for an exam of num_questions, following the blueprint weights."""
+    weights = EXAM_BLUEPRINT_WEIGHTS.get(certification_name)
+    if weights is None or len(weights) != len(domains):
+        weights = [1] * len(domains)
+    total = sum(weights)
+    quotas = [num_questions * weight / total for weight in weights]
+    counts = [int(quota) for quota in quotas]
+    # Largest remainders get the questions lost to rounding down
+    by_remainder = sorted(range(len(domains)), key=lambda i: quotas[i] - counts[i], reverse=True)
+    for i in by_remainder[:num_questions - sum(counts)]:
+        counts[i] += 1
+    return dict(zip(domains, counts))
+
+def _fill_exam_gaps(certification_name: str, gaps: Dict[str, int], targets: Dict[str, int]) -> None:
+    """
+    Generate the missing cards for several domains at once. Small gaps are packed
+    into batched JSON calls of up to EXAM_BATCH_CARDS cards; gaps too big for one
+    request grow that domain's deck in rounds. All of these run concurrently.
+    """
+    large = [domain for domain in gaps if gaps[domain] > MAX_CARDS_PER_REQUEST]
+    batches: List[List[str]] = []
+    batch_cards = EXAM_BATCH_CARDS
+    for domain in sorted(set(gaps) - set(large), key=gaps.get, reverse=True):
+        if batch_cards + gaps[domain] > EXAM_BATCH_CARDS:
+            batches.append([])
+            batch_cards = 0
+        batches[-1].append(domain)
+        batch_cards += gaps[domain]
+
+    service = get_gemini_service()
+    with ThreadPoolExecutor(max_workers=min(4, len(batches) + len(large)), thread_name_prefix="exam-fill") as executor:
+        futures = {
+            executor.submit(
+                service.generate_flashcards_batch, certification_name, batch,
+                max(gaps[domain] for domain in batch)
+            ): batch
+            for batch in batches
+        }
+        for domain in large:
+            futures[executor.submit(get_cached_certification_data, certification_name, domain, targets[domain])] = None
+        for future in as_completed(futures):
+            try:
+                generated = future.result()
+            except GenerationError as e:
+                print(f"Error generating exam questions: {str(e)}")
+                continue
+            if futures[future] is None:
+                continue  # Grown and cached by get_cached_certification_data
+            for domain, new_cards in generated.items():
+                _merge_into_deck(certification_name, domain, new_cards)
+
+        # Near-duplicates dropped from a batch leave a few domains short; top those up
+        short = [domain for batch in batches for domain in batch
+                 if len(_cached_deck(certification_name, domain)) < targets[domain]]
+        top_ups = [executor.submit(get_cached_certification_data, certification_name, domain, targets[domain])
+                   for domain in short]
+        for future in as_completed(top_ups):
+            try:
+                future.result()
+            except GenerationError as e:
+                print(f"Error generating exam questions: {str(e)}")
+
+def build_mock_exam(certification_name: str, num_questions: int = MOCK_EXAM_SIZE,
+                    seed: Optional[int] = None) -> List[Dict[str, str]]:
+    """
+    A shuffled exam of num_questions cards across all of a certification's
+    domains, weighted by its blueprint. Questions come from cached decks first;
+    only the shortfall is generated. Each card carries its 'domain'. The exam
+    can be shorter than asked if generation fails and the cache can't cover it.
+    """
+    domains = get_domains(certification_name)
+    allocation = exam_allocation(certification_name, domains, num_questions)
+    gaps = {}
+    for domain, count in allocation.items():
+        missing = count - len(_cached_deck(certification_name, domain))
+        if missing > 0:
+            gaps[domain] = missing
+    if gaps:
+        _fill_exam_gaps(certification_name, gaps, allocation)
+
+    rng = random.Random(seed)
+    exam = []
+    for domain, count in allocation.items():
+        cards = _cached_deck(certification_name, domain)
+        exam.extend(dict(card, domain=domain) for card in rng.sample(cards, min(count, len(cards))))
+    rng.shuffle(exam)
+    return exam
+
+def get_cache_stats() -> Dict[str, int]:
+    """Cache and request-coalescing counters for this process."""
+    stats = certification_cache.stats()
+    flight = generation_flight.stats()
+    stats["generations"] = flight["calls"]
+    stats["coalesced"] = flight["coalesced"]
+    with _refreshing_lock:
+        stats["refreshing"] = len(_refreshing)
+    return stats
+
+# Rate-limiter tokens prefetches and deck refreshes leave for foreground requests;
+# one that would dig into them is skipped rather than waiting
+PREFETCH_TOKEN_RESERVE = float(os.getenv('PREFETCH_TOKEN_RESERVE', 2))
+
+def _prefetch_deck(certification_name: str, domain: str, num_cards: int) -> None:
+    try:
+        with background_calls(reserve=PREFETCH_TOKEN_RESERVE):
+            get_cached_certification_data(certification_name, domain, num_cards)
+    except RateLimitDeferred:
+        print(f"Skipped prefetching {domain}: no rate limit to spare")
+    except GenerationError as e:
+        print(f"Error prefetching {domain}: {str(e)}")
+
+# Background warming of likely-next decks, bounded so it can't starve foreground requests
+prefetcher = Prefetcher(
+    _prefetch_deck,
+    max_workers=int(os.getenv('PREFETCH_WORKERS', 2)),
+    budget=int(os.getenv('PREFETCH_BUDGET', 8))
+)
+
+def prefetch_likely_next(session_id: str, certification_name: str, domain: str, num_cards: int) -> None:
+    """
+    Warm the cache for the next domain of the certification and the next larger
+    deck size of the current domain while the user studies the current deck.
+    Prefetches queued for another certification in this session are cancelled.
+    """
+    keys = []
+    domains = get_domains(certification_name, wait=False)
+    if domain in domains:
+        position = domains.index(domain)
+        if position + 1 < len(domains):
+            keys.append((certification_name, domains[position + 1], num_cards))
+    larger_sizes = [size for size in DECK_SIZES if size > num_cards]
+    if larger_sizes:
+        keys.append((certification_name, domain, larger_sizes[0]))
+    # Skip keys that are already warm so they don't use up the budget
+    keys = [key for key in keys if _needs_growth(*key)]
+    prefetcher.schedule(session_id, certification_name, keys)
+
+def _needs_growth(certification_name: str, domain: str, num_cards: int) -> bool:
+    cards = _cached_deck(certification_name, domain)
+    return len(cards) < num_cards and not _is_exhausted(_deck_key(certification_name, domain), cards)
+
+def cancel_prefetch(session_id: str) -> None:
+    prefetcher.cancel(session_id)
+
+def load_review_scheduler(learner_id: str) -> ReviewScheduler:
+    """A learner's due queue, rebuilt from their saved progress."""
+    return ReviewScheduler(progress_store.load(learner_id))
+
+def enroll_cards(learner_id: str, scheduler: ReviewScheduler, certification_name: str, domain: str,
+                 cards: List[Dict[str, str]]) -> int:
+    """Add a deck's unseen cards to the learner's reviews, due now. Returns how many were new."""
+    new_states = [ReviewState.new(certification_name, domain, card) for card in cards]
+    new_states = [state for state in new_states if scheduler.add(state)]
+    if new_states:
+        progress_store.save(learner_id, new_states)
+    return len(new_states)
+
+def record_review(learner_id: str, scheduler: ReviewScheduler, card_id: str, quality: int) -> ReviewState:
+    """Grade a card, reschedule it and queue the result for the next batched write."""
+    state = scheduler.review(card_id, quality)
+    progress_store.save(learner_id, [state])
+    return state
+
+# Process-wide gauges read at scrape time, plus the METRICS_PORT / METRICS_FILE exporters
+registry.gauge("whizcards_cache_entries", "Decks stored in the card cache", lambda: len(certification_cache))
+registry.gauge("whizcards_decks_loaded", "Decks held in the shared deck registry", lambda: len(deck_registry))
+registry.gauge("whizcards_generations_total", "Deck generations actually sent to the model",
+               lambda: generation_flight.stats()["calls"], "counter")
+registry.gauge("whizcards_coalesced_requests_total", "Deck requests that joined an in-flight generation",
+               lambda: generation_flight.stats()["coalesced"], "counter")
+registry.gauge("whizcards_prefetch_completed_total", "Background prefetches completed",
+               lambda: prefetcher.stats()["completed"], "counter")
+start_exporters()
+
+def stream_cached_certification_data(certification_name: str, domain: str, num_cards: int = 5) -> Iterator[Dict[str, str]]:
+    """
+    Yield certification cards one at a time. Cards already in the cached deck
+    come first; any missing ones are streamed from Gemini and the grown deck is
+    cached once the stream finishes. Concurrent requests for the same deck wait
+    for that stream instead of starting their own.
+    """
+    cache_key = _deck_key(certification_name, domain)
+    cards = _cached_deck(certification_name, domain)
+    if len(cards) >= num_cards or _is_exhausted(cache_key, cards):
+        yield from cards[:num_cards]
+        return
+
+    future, leader = generation_flight.join(cache_key)
+    if not leader:
+        # Someone else is already growing this deck; wait for their result
+        try:
+            cards = future.result()
+        except RateLimitDeferred:
+            # A prefetch gave way to foreground requests; the call below grows the deck
+            pass
+        except GenerationError as e:
+            cards = _fallback_deck(certification_name, domain, cards, e)
+        if len(cards) < num_cards:
+            cards = get_cached_certification_data(certification_name, domain, num_cards)
+        yield from cards[:num_cards]
+        return
+
+    cards = _cached_deck(certification_name, domain)
+    cached_count = len(cards)
+    error = None
+    try:
+        yield from cards[:num_cards]
+        if cached_count < num_cards:
+            index = _similarity_index(cache_key, cards)
+            try:
+                # Streamed on the shared event loop, so waiting on the model
+                # doesn't hold a thread per in-flight generation
+                new_cards = runner.iterate(get_gemini_service().stream_flashcards_async(
+                    certification_name, domain, min(num_cards - cached_count, MAX_CARDS_PER_REQUEST),
+                    [card['question'] for card in cards] or None
+                ))
+                for card in new_cards:
+                    if index.add(card['question']):
+                        cards.append(card)
+                        yield card
+                # Decks larger than one request are finished in non-streamed rounds
+                streamed_count = len(cards)
+                _generate_unique(certification_name, domain, cards, index, num_cards)
+                if len(cards) < num_cards:
+                    _mark_exhausted(cache_key, cards)
+                yield from cards[streamed_count:num_cards]
+            except GenerationError as e:
+                if len(cards) > 0:
+                    # The user already has cards on screen; keep what arrived
+                    print(f"Stopped streaming flashcards for {domain}: {str(e)}")
+                else:
+                    stale = certification_cache.get_stale(cache_key)
+                    if not stale:
+                        error = e
+                        raise
+                    print(f"Serving {len(stale)} cached cards for {domain} after generation failed: {str(e)}")
+                    cards = stale
+                    cached_count = len(stale)
+                    yield from stale[:num_cards]
+    finally:
+        try:
+            # Also reached when the stream is abandoned early: cards already
+            # generated are kept rather than thrown away
+            if len(cards) > cached_count:
+                _store_deck(certification_name, domain, cards)
+        finally:
+            # Waiters get whatever arrived, even if this stream was abandoned early
+            generation_flight.complete(cache_key, result=cards, error=error)
 
 """
 Original static data structure (kept as reference):
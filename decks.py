@@ -0,0 +1,111 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+
+class Card:
+    """
+    An immutable question/answer pair with interned strings.
+
+    Reads like the card dicts it stands in for (``card['question']``), so code
+    that takes either doesn't need to know which it has.
+    """
+
+    __slots__ = ("question", "answer")
+
+    def __init__(self, question: str, answer: str):
+        object.__setattr__(self, "question", sys.intern(question))
+        object.__setattr__(self, "answer", sys.intern(answer))
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("Card is immutable")
+
+    def __getitem__(self, key: str) -> str:
+        if key not in Card.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        return getattr(self, key) if key in Card.__slots__ else default
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"question": self.question, "answer": self.answer}
+
+
+def deck_id(certification: str, domain: str, cards: Iterable[Dict[str, str]]) -> str:
+    """Content hash of a deck, so identical decks loaded by different sessions share an id."""
+    digest = hashlib.sha1(f"{certification}\n{domain}".encode("utf-8"))
+    for card in cards:
+        digest.update(f"\0{card['question']}\0{card['answer']}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class Deck:
+    """An immutable, ordered set of cards for one certification domain."""
+
+    __slots__ = ("deck_id", "certification", "domain", "cards")
+
+    def __init__(self, deck_id: str, certification: str, domain: str, cards: Tuple[Card, ...]):
+        object.__setattr__(self, "deck_id", deck_id)
+        object.__setattr__(self, "certification", sys.intern(certification))
+        object.__setattr__(self, "domain", sys.intern(domain))
+        object.__setattr__(self, "cards", cards)
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError("Deck is immutable")
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter(self.cards)
+
+    def __getitem__(self, index: int) -> Card:
+        return self.cards[index]
+
+
+class DeckRegistry:
+    """
+    Process-wide store of loaded decks, keyed by deck id.
+
+    Sessions keep only a deck id plus their position in it, so a deck studied
+    by many sessions is held in memory once. The least recently used decks are
+    dropped once more than ``max_decks`` are registered; a session whose deck
+    was dropped loads it again.
+    """
+
+    def __init__(self, max_decks: int = 256):
+        self.max_decks = max_decks
+        self._decks: "OrderedDict[str, Deck]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, certification: str, domain: str, cards: Iterable[Dict[str, str]]) -> Deck:
+        """The shared deck with these cards, created on first registration."""
+        cards = list(cards)
+        key = deck_id(certification, domain, cards)
+        with self._lock:
+            deck = self._decks.get(key)
+            if deck is not None:
+                self._decks.move_to_end(key)
+                return deck
+        # Built outside the lock; if another session registers the same deck meanwhile, theirs wins
+        deck = Deck(key, certification, domain, tuple(Card(card['question'], card['answer']) for card in cards))
+        with self._lock:
+            deck = self._decks.setdefault(key, deck)
+            self._decks.move_to_end(key)
+            while len(self._decks) > self.max_decks:
+                self._decks.popitem(last=False)
+        return deck
+
+    def get(self, deck_id: str) -> Optional[Deck]:
+        with self._lock:
+            deck = self._decks.get(deck_id)
+            if deck is not None:
+                self._decks.move_to_end(deck_id)
+            return deck
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._decks)
@@ -0,0 +1,95 @@
+import re
+import threading
+import zlib
+from typing import Dict, List, Set, Tuple
+
+# Large prime for the (a * x + b) mod p hash family used by MinHash
+_PRIME = (1 << 61) - 1
+_WORD = re.compile(r"[a-z0-9]+")
+# Words that don't help tell two questions apart
+_STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "is", "are", "what",
+    "which", "how", "does", "do", "you", "your", "with", "when", "why", "that", "this",
+}
+
+
+def shingles(text: str, size: int = 2) -> Set[str]:
+    """Word n-grams of a normalized question (lowercase, no punctuation or stopwords)."""
+    words = [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index over question shingles for near-duplicate detection.
+
+    Each question's MinHash signature is split into `bands` bands; questions
+    sharing any band are candidates, and candidates are confirmed with the exact
+    Jaccard similarity of their shingle sets. Lookups therefore only compare
+    against a handful of candidates instead of every question in the deck.
+    """
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = 64, bands: int = 16, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        # Deterministic hash family so indexes built in different processes agree
+        state = seed
+        self._hash_params: List[Tuple[int, int]] = []
+        for _ in range(num_perm):
+            state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+            a = state % (_PRIME - 1) + 1
+            state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+            self._hash_params.append((a, state % _PRIME))
+        self._buckets: List[Dict[Tuple[int, ...], List[int]]] = [{} for _ in range(bands)]
+        self._shingles: List[Set[str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._shingles)
+
+    def _signature(self, items: Set[str]) -> List[int]:
+        hashed = [zlib.crc32(item.encode("utf-8")) for item in items] or [0]
+        return [min((a * x + b) % _PRIME for x in hashed) for a, b in self._hash_params]
+
+    def _band_keys(self, signature: List[int]) -> List[Tuple[int, ...]]:
+        return [tuple(signature[i * self.rows:(i + 1) * self.rows]) for i in range(self.bands)]
+
+    def _find_duplicate(self, items: Set[str], band_keys: List[Tuple[int, ...]]) -> bool:
+        candidates = set()
+        for band, key in enumerate(band_keys):
+            candidates.update(self._buckets[band].get(key, ()))
+        return any(jaccard(items, self._shingles[i]) >= self.threshold for i in candidates)
+
+    def is_duplicate(self, text: str) -> bool:
+        """Whether text is a near-duplicate of a question already in the index."""
+        items = shingles(text)
+        band_keys = self._band_keys(self._signature(items))
+        with self._lock:
+            return self._find_duplicate(items, band_keys)
+
+    def add(self, text: str, force: bool = False) -> bool:
+        """
+        Add text unless it is a near-duplicate of an indexed question. Returns
+        whether it was added; force=True always adds (e.g. to index an existing deck).
+        """
+        items = shingles(text)
+        band_keys = self._band_keys(self._signature(items))
+        with self._lock:
+            if not force and self._find_duplicate(items, band_keys):
+                return False
+            position = len(self._shingles)
+            self._shingles.append(items)
+            for band, key in enumerate(band_keys):
+                self._buckets[band].setdefault(key, []).append(position)
+            return True
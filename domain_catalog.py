@@ -0,0 +1,144 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from card_cache import CardCache
+from single_flight import SingleFlight
+
+_CERTIFICATIONS_KEY = "__certifications__"
+
+
+class DomainCatalog:
+    """
+    Exam domains for any certification, resolved through the model and cached.
+
+    Certifications in `static` use their predefined domains. Others are resolved
+    with `resolve` once and stored in `cache`; after the cache TTL the stored
+    list is still served while a background refresh replaces it
+    (stale-while-revalidate). Results are also memoized in memory for
+    `memo_seconds`, so repeated sidebar renders don't touch the database. A
+    resolution that failed or found no domains isn't cached, but it isn't
+    retried for `retry_seconds` either; until then it fails the same way.
+    """
+
+    def __init__(self, resolve: Callable[[str], List[str]], cache: CardCache,
+                 static: Dict[str, List[str]], memo_seconds: float = 300, retry_seconds: float = 60,
+                 max_workers: int = 2):
+        self._resolve = resolve
+        self._cache = cache
+        self._static = static
+        self.memo_seconds = memo_seconds
+        self.retry_seconds = retry_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="domain-catalog")
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self._memo: Dict[str, Tuple[List[str], float]] = {}
+        # certification -> (error, or None for an empty answer; when to try again)
+        self._failures: Dict[str, Tuple[Optional[Exception], float]] = {}
+        self._refreshing: Set[str] = set()
+
+    def certifications(self) -> List[str]:
+        """Predefined certifications first, then those added at runtime."""
+        added = self._cache.get_stale(_CERTIFICATIONS_KEY) or []
+        return list(self._static) + [name for name in added if name not in self._static]
+
+    def add_certification(self, certification: str) -> None:
+        """Remember a certification and resolve its domains in the background."""
+        certification = certification.strip()
+        if not certification or certification in self._static:
+            return
+        with self._lock:
+            added = self._cache.get_stale(_CERTIFICATIONS_KEY) or []
+            if certification not in added:
+                self._cache.set(_CERTIFICATIONS_KEY, added + [certification])
+        self.prefetch([certification])
+
+    def domains(self, certification: str, wait: bool = True) -> List[str]:
+        """
+        Domains for a certification. Unknown certifications are resolved now if
+        wait is true (raising the resolver's error on failure), otherwise in the
+        background with [] returned meanwhile.
+        """
+        if certification in self._static:
+            return self._static[certification]
+        with self._lock:
+            memo = self._memo.get(certification)
+        if memo is not None and time.monotonic() < memo[1]:
+            return memo[0]
+
+        domains = self._cache.get(self._key(certification))
+        if domains is None:
+            stale = self._cache.get_stale(self._key(certification))
+            if stale or not wait:
+                self.prefetch([certification])
+                return stale or []
+            failure = self._recent_failure(certification)
+            if failure is not None:
+                if failure[0] is not None:
+                    raise failure[0]
+                return []
+            domains = self._flight.do(certification, lambda: self._resolve_and_store(certification))
+        self._remember(certification, domains)
+        return domains
+
+    def prefetch(self, certifications: Iterable[str]) -> None:
+        """Resolve or refresh domains in the background for certifications that need it."""
+        for certification in certifications:
+            if certification in self._static or self._cache.get(self._key(certification)) is not None:
+                continue
+            if self._recent_failure(certification) is not None:
+                continue
+            with self._lock:
+                if certification in self._refreshing:
+                    continue
+                self._refreshing.add(certification)
+            self._executor.submit(self._refresh, certification)
+
+    def _refresh(self, certification: str) -> None:
+        try:
+            self._flight.do(certification, lambda: self._resolve_and_store(certification))
+        except Exception as e:
+            print(f"Error resolving domains for {certification}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(certification)
+
+    def _resolve_and_store(self, certification: str) -> List[str]:
+        try:
+            domains = self._resolve(certification)
+        except Exception as e:
+            self._record_failure(certification, e)
+            raise
+        # An empty answer isn't worth caching; keep serving the previous list instead
+        if domains:
+            self._cache.set(self._key(certification), domains)
+            self._remember(certification, domains)
+            with self._lock:
+                self._failures.pop(certification, None)
+        else:
+            self._record_failure(certification, None)
+        return domains
+
+    def _record_failure(self, certification: str, error: Optional[Exception]) -> None:
+        with self._lock:
+            self._failures[certification] = (error, time.monotonic() + self.retry_seconds)
+
+    def _recent_failure(self, certification: str) -> Optional[Tuple[Optional[Exception], float]]:
+        """The last failed resolution for certification, if it is too recent to retry."""
+        with self._lock:
+            failure = self._failures.get(certification)
+        if failure is not None and time.monotonic() < failure[1]:
+            return failure
+        return None
+
+    def _remember(self, certification: str, domains: List[str]) -> None:
+        # Like the cache, don't hold on to an empty answer; the next render asks again
+        if not domains:
+            return
+        with self._lock:
+            self._memo[certification] = (domains, time.monotonic() + self.memo_seconds)
+
+    @staticmethod
+    def _key(certification: str) -> str:
+        return f"domains:{certification}"
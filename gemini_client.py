@@ -0,0 +1,364 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Deque, Iterator, Optional
+
+
+class GenerationError(Exception):
+    """A model call failed. retryable tells whether trying again might help."""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class CircuitOpenError(GenerationError):
+    """Raised without calling the model while the circuit breaker is open."""
+
+
+class RateLimitDeferred(GenerationError):
+    """A background call gave way because no rate-limiter token was free to spare."""
+
+
+# Tokens background calls must leave in the bucket, or None for foreground calls
+_background_reserve: ContextVar[Optional[float]] = ContextVar("background_reserve", default=None)
+
+
+@contextmanager
+def background_calls(reserve: float = 0.0) -> Iterator[None]:
+    """
+    Mark model calls made inside the block as background work. Instead of
+    waiting for the rate limiter they take a token only if more than `reserve`
+    would be left for foreground requests, and raise RateLimitDeferred otherwise.
+    """
+    token = _background_reserve.set(reserve)
+    try:
+        yield
+    finally:
+        _background_reserve.reset(token)
+
+
+def in_background() -> bool:
+    return _background_reserve.get() is not None
+
+
+# HTTP-style status codes and exception names worth retrying: quota, overload and timeouts
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "GatewayTimeout", "Aborted", "TimeoutError", "ConnectionError",
+}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Classify an SDK or network exception without importing the SDK's error types."""
+    if isinstance(error, GenerationError):
+        return error.retryable
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    if isinstance(code, int) and code in RETRYABLE_CODES:
+        return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` calls per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _try_take(self, reserve: float = 0.0) -> float:
+        """
+        Take a token if one is available with `reserve` tokens to spare.
+        Returns 0, or how long until one will be.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1 + reserve:
+                self._tokens -= 1
+                return 0.0
+            return (1 + reserve - self._tokens) / self.rate
+
+    def acquire(self, timeout: Optional[float] = None, reserve: float = 0.0) -> bool:
+        """
+        Take one token, waiting up to timeout seconds. Returns False if none came
+        free. With a reserve, a token is only taken if that many would be left.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait_time = self._try_take(reserve)
+            if not wait_time:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait_time = min(wait_time, remaining)
+            time.sleep(wait_time)
+
+    async def acquire_async(self, timeout: Optional[float] = None, reserve: float = 0.0) -> bool:
+        """acquire() for coroutines: waits without blocking the event loop."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait_time = self._try_take(reserve)
+            if not wait_time:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait_time = min(wait_time, remaining)
+            await asyncio.sleep(wait_time)
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds, then lets a single trial call through (half-open).
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Give up an allowed call without an outcome, freeing the half-open trial slot."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class ResilientModel:
+    """
+    Wraps a model's generate_content with shared rate limiting, retries with
+    exponential jittered backoff, a circuit breaker and optional hedged requests.
+
+    Hedging sends a duplicate request when the first hasn't answered within the
+    observed p95 latency, and returns whichever finishes first. Streamed calls
+    are never hedged, and only their initial request is retried.
+    """
+
+    def __init__(self, model: Any, rate_limiter: Optional[TokenBucket] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None, max_retries: int = 3,
+                 base_delay: float = 0.5, max_delay: float = 8.0, hedge: bool = False,
+                 hedge_min_samples: int = 20, rate_limit_timeout: float = 30.0):
+        self.model = model
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self.rate_limit_timeout = rate_limit_timeout
+        self._latencies: Deque[float] = deque(maxlen=200)
+        self._latency_lock = threading.Lock()
+        self._hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge") if hedge else None
+
+    def __getattr__(self, name: str) -> Any:
+        # Anything other than generate_content goes straight to the wrapped model
+        return getattr(self.model, name)
+
+    def latency_p95(self) -> Optional[float]:
+        with self._latency_lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def generate_content(self, prompt: Any, **kwargs: Any) -> Any:
+        self._check_circuit()
+        attempt = 0
+        while True:
+            self._take_token()
+            try:
+                response = self._call(prompt, **kwargs)
+            except Exception as e:
+                time.sleep(self._backoff(e, attempt))
+                attempt += 1
+                continue
+            self.circuit_breaker.record_success()
+            return response
+
+    async def generate_content_async(self, prompt: Any, **kwargs: Any) -> Any:
+        """
+        generate_content() for coroutines, with the same rate limiting, retries,
+        circuit breaker and hedging. Uses the model's own generate_content_async
+        when it has one, otherwise runs the blocking call on a worker thread.
+        """
+        self._check_circuit()
+        attempt = 0
+        while True:
+            await self._take_token_async()
+            try:
+                response = await self._call_async(prompt, **kwargs)
+            except Exception as e:
+                await asyncio.sleep(self._backoff(e, attempt))
+                attempt += 1
+                continue
+            self.circuit_breaker.record_success()
+            return response
+
+    def _check_circuit(self) -> None:
+        if not self.circuit_breaker.allow():
+            raise CircuitOpenError("Gemini is unavailable right now, please try again shortly", retryable=True)
+
+    def _backoff(self, error: Exception, attempt: int) -> float:
+        """
+        Record a failed attempt with the circuit breaker and return how long to
+        wait before the next one. Raises GenerationError when it shouldn't be retried.
+        """
+        retryable = is_retryable(error)
+        if retryable:
+            self.circuit_breaker.record_failure()
+        else:
+            # The request itself was bad; the service is fine
+            self.circuit_breaker.record_success()
+        if not retryable or attempt >= self.max_retries or not self.circuit_breaker.allow():
+            raise GenerationError(f"{type(error).__name__}: {error}", retryable=retryable) from error
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+        # Full jitter so many workers hitting a quota error don't retry in lockstep
+        return random.uniform(0, delay)
+
+    def _call(self, prompt: Any, **kwargs: Any) -> Any:
+        hedge_after = self.latency_p95() if self.hedge and not kwargs.get("stream") else None
+        start = time.monotonic()
+        if hedge_after is None:
+            response = self.model.generate_content(prompt, **kwargs)
+        else:
+            response = self._hedged_call(hedge_after, prompt, **kwargs)
+        if not kwargs.get("stream"):
+            with self._latency_lock:
+                self._latencies.append(time.monotonic() - start)
+        return response
+
+    def _hedged_call(self, hedge_after: float, prompt: Any, **kwargs: Any) -> Any:
+        primary = self._hedge_executor.submit(self.model.generate_content, prompt, **kwargs)
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+        # Only hedge if the rate limiter has a token to spare right now
+        if self.rate_limiter is not None and not self.rate_limiter.acquire(timeout=0, reserve=_background_reserve.get() or 0.0):
+            return primary.result()
+        backup = self._hedge_executor.submit(self.model.generate_content, prompt, **kwargs)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _model_call_async(self, prompt: Any, **kwargs: Any) -> Awaitable[Any]:
+        native = getattr(self.model, "generate_content_async", None)
+        if native is not None:
+            return native(prompt, **kwargs)
+        return asyncio.to_thread(self.model.generate_content, prompt, **kwargs)
+
+    async def _call_async(self, prompt: Any, **kwargs: Any) -> Any:
+        hedge_after = self.latency_p95() if self.hedge and not kwargs.get("stream") else None
+        start = time.monotonic()
+        if hedge_after is None:
+            response = await self._model_call_async(prompt, **kwargs)
+        else:
+            response = await self._hedged_call_async(hedge_after, prompt, **kwargs)
+        if not kwargs.get("stream"):
+            with self._latency_lock:
+                self._latencies.append(time.monotonic() - start)
+        return response
+
+    async def _hedged_call_async(self, hedge_after: float, prompt: Any, **kwargs: Any) -> Any:
+        primary = asyncio.ensure_future(self._model_call_async(prompt, **kwargs))
+        done, _ = await asyncio.wait([primary], timeout=hedge_after)
+        reserve = _background_reserve.get() or 0.0
+        if done or (self.rate_limiter is not None and not self.rate_limiter.acquire(timeout=0, reserve=reserve)):
+            return await primary
+        backup = asyncio.ensure_future(self._model_call_async(prompt, **kwargs))
+        pending = {primary, backup}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The loser keeps no connection open once we have an answer
+            for task in pending:
+                task.cancel()
+
+    async def _take_token_async(self) -> None:
+        if self.rate_limiter is None:
+            return
+        reserve = _background_reserve.get()
+        if reserve is not None:
+            self._take_background_token(reserve)
+        elif not await self.rate_limiter.acquire_async(timeout=self.rate_limit_timeout):
+            self.circuit_breaker.release()
+            raise GenerationError("Timed out waiting for the Gemini rate limiter", retryable=True)
+
+    def _take_token(self) -> None:
+        if self.rate_limiter is None:
+            return
+        reserve = _background_reserve.get()
+        if reserve is not None:
+            self._take_background_token(reserve)
+        elif not self.rate_limiter.acquire(timeout=self.rate_limit_timeout):
+            self.circuit_breaker.release()
+            raise GenerationError("Timed out waiting for the Gemini rate limiter", retryable=True)
+
+    def _take_background_token(self, reserve: float) -> None:
+        # Background work never waits in line with foreground requests
+        if not self.rate_limiter.acquire(timeout=0, reserve=reserve):
+            self.circuit_breaker.release()
+            raise RateLimitDeferred("No rate limit to spare for background work", retryable=True)
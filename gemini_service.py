@@ -1,73 +1,514 @@
-import google.generativeai as genai
+import asyncio
+import json
 import os
-from typing import Dict, List, Tuple
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import prompts
+from gemini_client import CircuitBreaker, GenerationError, ResilientModel, TokenBucket
+from metrics import generation_latency, parse_latency, record_usage, trace
+from model_backends import ModelBackend, create_model_backend
+
+# Shared by every GeminiService in the process so the quota is respected across sessions
+shared_rate_limiter = TokenBucket(
+    rate=float(os.getenv('GEMINI_REQUESTS_PER_MINUTE', 60)) / 60,
+    capacity=float(os.getenv('GEMINI_BURST', 10))
+)
+shared_circuit_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv('GEMINI_BREAKER_THRESHOLD', 5)),
+    reset_timeout=float(os.getenv('GEMINI_BREAKER_RESET_SECONDS', 30))
+)
+
+
+class FlashcardParser:
+    """
+    Incremental parser for the Q:/A: flashcard format.
+
+    Text can be fed in arbitrary chunks (e.g. from a streamed response); each
+    card is returned as soon as its answer line is complete.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._current_card = {}
+
+    def feed(self, text: str) -> List[Dict[str, str]]:
+        """Consume a chunk of text and return the cards it completed."""
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        cards = []
+        for line in lines:
+            card = self._parse_line(line)
+            if card:
+                cards.append(card)
+        return cards
+
+    def close(self) -> List[Dict[str, str]]:
+        """Flush the trailing unterminated line at the end of the response."""
+        line, self._buffer = self._buffer, ""
+        card = self._parse_line(line)
+        return [card] if card else []
+
+    def _parse_line(self, line: str) -> Optional[Dict[str, str]]:
+        line = line.strip()
+        if line.startswith('Q:'):
+            self._current_card = {'question': line[2:].strip()}
+        elif line.startswith('A:') and 'question' in self._current_card:
+            card = self._current_card
+            card['answer'] = line[2:].strip()
+            self._current_card = {}
+            return card
+        return None
+
+
+def parse_flashcards(text: str) -> List[Dict[str, str]]:
+    """Parse a complete Q:/A: formatted response into flashcards."""
+    parser = FlashcardParser()
+    return parser.feed(text) + parser.close()
+
+
+# Response schema for batch generation: one entry per requested domain
+FLASHCARD_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "domains": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "domain": {"type": "string"},
+                    "cards": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "question": {"type": "string"},
+                                "answer": {"type": "string"}
+                            },
+                            "required": ["question", "answer"]
+                        }
+                    }
+                },
+                "required": ["domain", "cards"]
+            }
+        }
+    },
+    "required": ["domains"]
+}
+
+
+def parse_flashcard_batch(text: str, domains: List[str], num_cards: int) -> Dict[str, List[Dict[str, str]]]:
+    """
+    Decode a batch JSON response and split it back into per-domain card lists.
+    Entries for domains that weren't requested and malformed cards are dropped.
+    """
+    payload = json.loads(text)
+    # The model sometimes changes the case or spacing of domain names
+    requested = {domain.strip().lower(): domain for domain in domains}
+    content = {}
+    for entry in payload.get("domains", []):
+        if not isinstance(entry, dict):
+            continue
+        domain = requested.get(str(entry.get("domain", "")).strip().lower())
+        if domain is None:
+            continue
+        cards = [
+            {'question': card['question'].strip(), 'answer': card['answer'].strip()}
+            for card in entry.get("cards", [])
+            if isinstance(card, dict)
+            and isinstance(card.get('question'), str)
+            and isinstance(card.get('answer'), str)
+        ]
+        if cards:
+            content.setdefault(domain, []).extend(cards)
+    return {domain: cards[:num_cards] for domain, cards in content.items()}
+
+
+def _response_text(response) -> str:
+    """Response text, raising GenerationError when the model returned none (e.g. blocked)."""
+    try:
+        return response.text
+    except ValueError as e:
+        raise GenerationError(f"Gemini returned no text: {str(e)}") from e
+
+
+def _chunk_text(chunk) -> str:
+    # Streamed chunks without text (e.g. the final one carrying only the finish reason) are skipped
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+_LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def _parse_domains(response) -> List[str]:
+    # Models often number or bullet the list despite the instructions
+    domains = [_LIST_MARKER.sub('', line).strip() for line in _response_text(response).split('\n')]
+    return [domain for domain in domains if domain]
+
+
+def _observe_call(operation: str, prompt: str, start: float, outcome: str, stream: bool) -> None:
+    elapsed = time.perf_counter() - start
+    generation_latency.observe(elapsed, operation=operation, outcome=outcome)
+    trace("generate_content", operation=operation, outcome=outcome,
+          seconds=round(elapsed, 6), prompt_chars=len(prompt), stream=stream)
+
+
+class _CardStream:
+    """
+    Cards from a streamed response, up to a limit. The sync and async streams
+    only differ in how they iterate chunks, so they share this.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.count = 0
+        self._parser = FlashcardParser()
+
+    @property
+    def done(self) -> bool:
+        return self.count >= self.limit
+
+    def feed(self, chunk) -> List[Dict[str, str]]:
+        return self._take(self._parser.feed(_chunk_text(chunk)))
+
+    def close(self) -> List[Dict[str, str]]:
+        return self._take(self._parser.close())
+
+    def _take(self, cards: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        cards = cards[:self.limit - self.count]
+        self.count += len(cards)
+        return cards
+
+
+def _stream_error(error: Exception) -> GenerationError:
+    # The SDK raises mid-stream errors while iterating; these aren't retried
+    return GenerationError(f"Error streaming flashcards: {str(error)}")
+
+
+def _rejects_json_mode(error: GenerationError) -> bool:
+    """Whether a failed batch was refused as a bad request, as models without JSON mode do."""
+    cause = error.__cause__
+    if error.retryable or cause is None:
+        return False
+    return getattr(cause, "code", None) == 400 or type(cause).__name__ in ("InvalidArgument", "BadRequest")
+
 
 class GeminiService:
-    def __init__(self, api_key: str):
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
-    
+    """
+    Generates certification content with Gemini. Failed calls raise
+    GenerationError rather than returning an empty result.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[ModelBackend] = None,
+                 prompt_style: Optional[str] = None):
+        """
+        Use the given model backend, or the one selected by GEMINI_BACKEND
+        (the real Gemini API unless set to 'mock'). prompt_style picks the
+        templates in prompts.py, defaulting to GEMINI_PROMPT_STYLE.
+        """
+        self.prompt_style = prompt_style or prompts.default_style()
+        if self.prompt_style not in prompts.PROMPT_STYLES:
+            raise ValueError(f"Unknown prompt style '{self.prompt_style}'")
+        if model is None:
+            model = create_model_backend(api_key)
+        self.model = ResilientModel(
+            model,
+            rate_limiter=shared_rate_limiter,
+            circuit_breaker=shared_circuit_breaker,
+            max_retries=int(os.getenv('GEMINI_MAX_RETRIES', 3)),
+            hedge=os.getenv('GEMINI_HEDGE_REQUESTS', '').lower() in ('1', 'true', 'yes')
+        )
+        # Cleared once the model rejects JSON mode; batches then use the Q:/A: format
+        self.json_mode = True
+
+    def _generate(self, operation: str, prompt: str, **kwargs):
+        """Call the model, recording latency, token usage and an optional trace line."""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = self.model.generate_content(prompt, **kwargs)
+            outcome = "ok"
+        finally:
+            _observe_call(operation, prompt, start, outcome, kwargs.get("stream", False))
+        if not kwargs.get("stream"):
+            # Streamed responses only carry usage once fully consumed
+            record_usage(operation, response, self.prompt_style)
+        return response
+
+    async def _generate_async(self, operation: str, prompt: str, **kwargs):
+        """_generate() on the model's async API."""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await self.model.generate_content_async(prompt, **kwargs)
+            outcome = "ok"
+        finally:
+            _observe_call(operation, prompt, start, outcome, kwargs.get("stream", False))
+        if not kwargs.get("stream"):
+            record_usage(operation, response, self.prompt_style)
+        return response
+
+
     def get_certification_domains(self, certification: str) -> List[str]:
         """Get domains for a specific certification."""
-        prompt = f"""
-        List the main domains/topics for the {certification} certification.
-        Return only the domain names as a simple list without any additional text or numbers.
-        These should be the actual exam domains from the official certification guide.
+        response = self._generate(
+            "get_certification_domains", prompts.domains_prompt(self.prompt_style, certification),
+            generation_config=prompts.domains_config(self.prompt_style)
+        )
+        return _parse_domains(response)
+
+    async def get_certification_domains_async(self, certification: str) -> List[str]:
+        response = await self._generate_async(
+            "get_certification_domains", prompts.domains_prompt(self.prompt_style, certification),
+            generation_config=prompts.domains_config(self.prompt_style)
+        )
+        return _parse_domains(response)
+
+    def _flashcards_prompt(self, certification: str, domain: str, num_cards: int,
+                           exclude_questions: Optional[List[str]] = None) -> str:
+        return prompts.flashcards_prompt(self.prompt_style, certification, domain, num_cards, exclude_questions)
+
+    def generate_flashcards(self, certification: str, domain: str, num_cards: int = 5,
+                            exclude_questions: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        """
+        Generate flashcards for a specific certification domain.
+        Questions in exclude_questions are ones the caller already has.
+        """
+        prompt = self._flashcards_prompt(certification, domain, num_cards, exclude_questions)
+        response = self._generate(
+            "generate_flashcards", prompt, generation_config=prompts.flashcards_config(self.prompt_style, num_cards)
+        )
+        text = _response_text(response)
+        with parse_latency.time(format="qa"):
+            cards = parse_flashcards(text)
+        return cards[:num_cards]  # Ensure we only return the requested number of cards
+
+    async def generate_flashcards_async(self, certification: str, domain: str, num_cards: int = 5,
+                                        exclude_questions: Optional[List[str]] = None) -> List[Dict[str, str]]:
+        prompt = self._flashcards_prompt(certification, domain, num_cards, exclude_questions)
+        response = await self._generate_async(
+            "generate_flashcards", prompt, generation_config=prompts.flashcards_config(self.prompt_style, num_cards)
+        )
+        text = _response_text(response)
+        with parse_latency.time(format="qa"):
+            cards = parse_flashcards(text)
+        return cards[:num_cards]
+
+    def stream_flashcards(self, certification: str, domain: str, num_cards: int = 5,
+                          exclude_questions: Optional[List[str]] = None) -> Iterator[Dict[str, str]]:
+        """
+        Generate flashcards with a streamed response, yielding each card as soon
+        as it has been fully received.
         """
+        prompt = self._flashcards_prompt(certification, domain, num_cards, exclude_questions)
+        cards = _CardStream(num_cards)
+        response = self._generate(
+            "stream_flashcards", prompt, stream=True,
+            generation_config=prompts.flashcards_config(self.prompt_style, num_cards)
+        )
         try:
-            response = self.model.generate_content(prompt)
-            domains = [domain.strip() for domain in response.text.split('\n') if domain.strip()]
-            return domains
+            for chunk in response:
+                yield from cards.feed(chunk)
+                if cards.done:
+                    return
         except Exception as e:
-            print(f"Error fetching domains: {str(e)}")
-            return []
-
-    def generate_flashcards(self, certification: str, domain: str, num_cards: int = 5) -> List[Dict[str, str]]:
-        """Generate flashcards for a specific certification domain."""
-        prompt = f"""
-        Create {num_cards} flash cards for the {domain} domain of {certification} certification.
-        Each card should have a question and answer format.
-        Focus on important concepts and key points that are likely to appear in the actual certification exam.
-        Format each card as:
-        Q: [Question]
-        A: [Answer]
-
-        Make sure each question-answer pair is separated by a newline.
-        """
+            raise _stream_error(e) from e
+        finally:
+            record_usage("stream_flashcards", response, self.prompt_style)
+        yield from cards.close()
+
+    async def stream_flashcards_async(self, certification: str, domain: str, num_cards: int = 5,
+                                      exclude_questions: Optional[List[str]] = None) -> AsyncIterator[Dict[str, str]]:
+        """stream_flashcards() as an async generator, yielding each card as it arrives."""
+        prompt = self._flashcards_prompt(certification, domain, num_cards, exclude_questions)
+        cards = _CardStream(num_cards)
+        response = await self._generate_async(
+            "stream_flashcards", prompt, stream=True,
+            generation_config=prompts.flashcards_config(self.prompt_style, num_cards)
+        )
         try:
-            response = self.model.generate_content(prompt)
-            cards = []
-            current_card = {}
-            
-            for line in response.text.split('\n'):
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                if line.startswith('Q:'):
-                    if current_card:
-                        cards.append(current_card)
-                        current_card = {}
-                    current_card['question'] = line[2:].strip()
-                elif line.startswith('A:'):
-                    current_card['answer'] = line[2:].strip()
-            
-            if current_card:
-                cards.append(current_card)
-                
-            return cards[:num_cards]  # Ensure we only return the requested number of cards
+            async for chunk in response:
+                for card in cards.feed(chunk):
+                    yield card
+                if cards.done:
+                    return
         except Exception as e:
-            print(f"Error generating flashcards: {str(e)}")
-            return []
+            raise _stream_error(e) from e
+        finally:
+            record_usage("stream_flashcards", response, self.prompt_style)
+        for card in cards.close():
+            yield card
 
-    def get_certification_content(self, certification: str) -> Dict[str, List[Dict[str, str]]]:
-        """Get complete content for a certification including domains and flashcards."""
-        domains = self.get_certification_domains(certification)
+    def generate_flashcards_batch(self, certification: str, domains: List[str],
+                                  num_cards: int = 5) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Generate flashcards for several domains of a certification in a single
+        request, using structured JSON output. Returns cards keyed by domain;
+        domains the model skipped are missing from the result.
+
+        Models without JSON mode reject the request; the domains are then
+        generated one request each in the Q:/A: format, and so are later batches.
+        """
+        if not domains:
+            return {}
+        if not self.json_mode:
+            return self._generate_flashcards_each(certification, domains, num_cards)
+        prompt = prompts.flashcard_batch_prompt(self.prompt_style, certification, domains, num_cards)
+        generation_config = prompts.flashcard_batch_config(
+            self.prompt_style, len(domains), num_cards, FLASHCARD_BATCH_SCHEMA
+        )
+        try:
+            response = self._generate("generate_flashcards_batch", prompt, generation_config=generation_config)
+        except GenerationError as e:
+            if not _rejects_json_mode(e):
+                raise
+            print(f"JSON mode was rejected, generating domains one at a time: {str(e)}")
+            self.json_mode = False
+            return self._generate_flashcards_each(certification, domains, num_cards)
+        try:
+            with parse_latency.time(format="json"):
+                return parse_flashcard_batch(_response_text(response), domains, num_cards)
+        except (ValueError, AttributeError) as e:
+            # json.JSONDecodeError is a ValueError; AttributeError covers a non-object payload
+            raise GenerationError(f"Malformed flashcard batch: {str(e)}") from e
+
+    def _generate_flashcards_each(self, certification: str, domains: List[str],
+                                  num_cards: int) -> Dict[str, List[Dict[str, str]]]:
         content = {}
-        
         for domain in domains:
-            cards = self.generate_flashcards(certification, domain)
-            if cards:  # Only add domain if we successfully generated cards
+            try:
+                cards = self.generate_flashcards(certification, domain, num_cards)
+            except GenerationError as e:
+                print(f"Error generating flashcards for {domain}: {str(e)}")
+                continue
+            if cards:
                 content[domain] = cards
-                
-        return content
\ No newline at end of file
+        return content
+
+    def get_certification_content(self, certification: str, num_cards: int = 5,
+                                  max_workers: Optional[int] = 4,
+                                  timeout: Optional[float] = 60.0) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Get complete content for a certification including domains and flashcards.
+
+        Domains are generated concurrently on up to max_workers threads (1 means
+        sequential). Domains that fail, or don't finish within timeout seconds of
+        their call starting, are left out, so a partial result is returned rather than nothing.
+        """
+        domains = self.get_certification_domains(certification)
+        content = {}
+
+        if not max_workers or max_workers <= 1:
+            for domain in domains:
+                try:
+                    cards = self.generate_flashcards(certification, domain, num_cards)
+                except GenerationError as e:
+                    print(f"Error generating flashcards for {domain}: {str(e)}")
+                    continue
+                if cards:  # Only add domain if we successfully generated cards
+                    content[domain] = cards
+            return content
+
+        # When each domain's call actually began; queued domains aren't on the clock yet
+        started: Dict[str, float] = {}
+
+        def generate(domain: str) -> List[Dict[str, str]]:
+            started[domain] = time.monotonic()
+            return self.generate_flashcards(certification, domain, num_cards)
+
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="flashcards")
+        pending = {domain: executor.submit(generate, domain) for domain in domains}
+        abandoned = []
+        results = {}
+        try:
+            while pending:
+                now = time.monotonic()
+                if timeout is not None:
+                    for domain in [d for d in pending if d in started and now - started[d] >= timeout]:
+                        print(f"Timed out generating flashcards for {domain}")
+                        abandoned.append(pending.pop(domain))
+                    if pending and sum(not future.done() for future in abandoned) >= max_workers:
+                        # Every worker is stuck on a timed-out call, so the rest would never start
+                        for domain in pending:
+                            print(f"Timed out generating flashcards for {domain}")
+                        break
+                if not pending:
+                    break
+                wait_seconds = None
+                if timeout is not None:
+                    deadlines = [started[d] + timeout for d in pending if d in started]
+                    # Until a call has started there is no deadline yet; check again shortly
+                    wait_seconds = max(0.0, min(deadlines) - now) if deadlines else 0.05
+                done, _ = wait(pending.values(), timeout=wait_seconds, return_when=FIRST_COMPLETED)
+                for domain in [d for d, future in pending.items() if future in done]:
+                    try:
+                        cards = pending.pop(domain).result()
+                    except GenerationError as e:
+                        print(f"Error generating flashcards for {domain}: {str(e)}")
+                        continue
+                    if cards:  # Only add domain if we successfully generated cards
+                        results[domain] = cards
+        finally:
+            # Don't block on stragglers past the timeout
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # Keep the domains in their listed order
+        content = {domain: results[domain] for domain in domains if domain in results}
+        return content
+
+    async def iter_certification_content_async(self, certification: str, num_cards: int = 5,
+                                               max_concurrency: int = 4, timeout: Optional[float] = 60.0
+                                               ) -> AsyncIterator[Tuple[str, List[Dict[str, str]]]]:
+        """
+        Yield (domain, cards) for each domain of a certification as soon as it is
+        generated. Up to max_concurrency domains are in flight at once on the
+        event loop; domains that fail or take longer than timeout seconds are skipped.
+        """
+        domains = await self.get_certification_domains_async(certification)
+        async for domain, cards in self._iter_domain_cards(certification, domains, num_cards,
+                                                           max_concurrency, timeout):
+            yield domain, cards
+
+    async def get_certification_content_async(self, certification: str, num_cards: int = 5,
+                                              max_concurrency: int = 4,
+                                              timeout: Optional[float] = 60.0) -> Dict[str, List[Dict[str, str]]]:
+        """get_certification_content() on the event loop; domains keep their listed order."""
+        domains = await self.get_certification_domains_async(certification)
+        content = {}
+        async for domain, cards in self._iter_domain_cards(certification, domains, num_cards,
+                                                           max_concurrency, timeout):
+            content[domain] = cards
+        return {domain: content[domain] for domain in domains if domain in content}
+
+    async def _iter_domain_cards(self, certification: str, domains: List[str], num_cards: int,
+                                 max_concurrency: int, timeout: Optional[float]
+                                 ) -> AsyncIterator[Tuple[str, List[Dict[str, str]]]]:
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def generate(domain: str) -> Tuple[str, Optional[List[Dict[str, str]]]]:
+            async with semaphore:
+                try:
+                    return domain, await asyncio.wait_for(
+                        self.generate_flashcards_async(certification, domain, num_cards), timeout
+                    )
+                except asyncio.TimeoutError:
+                    print(f"Timed out generating flashcards for {domain}")
+                except GenerationError as e:
+                    print(f"Error generating flashcards for {domain}: {str(e)}")
+                return domain, None
+
+        tasks = [asyncio.ensure_future(generate(domain)) for domain in domains]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                domain, cards = await next_done
+                if cards:  # Only yield domains we successfully generated cards for
+                    yield domain, cards
+        finally:
+            # A consumer that stops early shouldn't leave generations running
+            for task in tasks:
+                task.cancel()
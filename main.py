@@ -1,7 +1,25 @@
+import time
+
+# Measure every script run; reruns cut short by st.rerun()/st.stop() aren't recorded
+script_start = time.perf_counter()
+
+import functools
+import os
+import sys
 import streamlit as st
 import random
-from data import SUPPORTED_CERTIFICATIONS, CERTIFICATION_DOMAINS, get_cached_certification_data
-import time
+import uuid
+from data import (
+    DECK_SIZES, MOCK_EXAM_SIZE, add_certification, build_mock_exam, cancel_prefetch,
+    enroll_cards, get_certifications, get_domains, load_deck, load_review_scheduler,
+    prefetch_likely_next, record_review, register_deck, search_cards,
+    stream_cached_certification_data
+)
+from gemini_client import GenerationError
+from metrics import rerun_latency, startup_latency, trace
+from srs import GRADES
+
+imports_done = time.perf_counter()
 
 # Set page configuration
 st.set_page_config(
@@ -10,11 +28,6 @@ st.set_page_config(
     layout="wide"
 )
 
-# Check for API key
-if 'GEMINI_API_KEY' not in st.secrets:
-    st.error("Please set the GEMINI_API_KEY in your Streamlit secrets.")
-    st.stop()
-
 # Initialize session state for certification data
 if 'current_certification_data' not in st.session_state:
     st.session_state.current_certification_data = None
@@ -272,15 +285,43 @@ st.markdown("""
 st.title("📚WhizCards💡Prep Flash Cards")
 st.markdown("---")
 
+# STARTUP_TIMING=1 reports how long the first paint of each session took, and
+# confirms the Gemini SDK wasn't imported to get there
+if 'first_paint_seconds' not in st.session_state:
+    first_paint = time.perf_counter() - script_start
+    st.session_state.first_paint_seconds = first_paint
+    startup_latency.observe(imports_done - script_start, phase="imports")
+    startup_latency.observe(first_paint, phase="first_paint")
+    if os.getenv('STARTUP_TIMING', '').lower() in ('1', 'true', 'yes'):
+        sdk_loaded = 'google.generativeai' in sys.modules
+        print(
+            f"Startup timing: imports {(imports_done - script_start) * 1000:.1f}ms, "
+            f"first paint {first_paint * 1000:.1f}ms, Gemini SDK loaded: {sdk_loaded}",
+            file=sys.stderr
+        )
+        trace("startup", imports_seconds=round(imports_done - script_start, 6),
+              first_paint_seconds=round(first_paint, 6), sdk_loaded=sdk_loaded)
+
 # Initialize session states if not exists
 if 'initialized' not in st.session_state:
     st.session_state.initialized = False
-    st.session_state.cards = None
-    st.session_state.revealed_answers = set()
+    # A session holds only the id of its shared deck, its position and a bitmap
+    # of revealed answers (bit i-1 for card i); the cards live in the registry
+    st.session_state.deck_id = None
+    st.session_state.deck_size = 0
+    st.session_state.revealed = 0
     st.session_state.current_card_index = 0
     st.session_state.show_answer = False
     st.session_state.last_cert = None
     st.session_state.last_domain = None
+    st.session_state.session_id = uuid.uuid4().hex
+
+def add_custom_certification():
+    certification = st.session_state.new_certification.strip()
+    if certification:
+        add_certification(certification)
+        st.session_state.cert_select = certification
+        st.session_state.new_certification = ""
 
 # Sidebar for controls
 with st.sidebar:
@@ -288,20 +329,33 @@ with st.sidebar:
     # Add view mode selection
     view_mode = st.radio(
         "Select View Mode",
-        ["Two Column View", "Carousel View"]
+        ["Two Column View", "Carousel View", "Spaced Repetition", "Mock Exam"]
     )
+    # Review progress is saved per learner, so it survives reloads and new sessions
+    if view_mode == "Spaced Repetition":
+        st.text_input("Learner name", key="learner_name", help="Your review progress is saved under this name")
     
     # Certification selection
     selected_cert = st.selectbox(
         "Select Certification",
-        SUPPORTED_CERTIFICATIONS,
+        get_certifications(),
         key='cert_select'
     )
+
+    # Any other certification can be added; its domains are looked up once and cached
+    with st.expander("➕ Add a Certification"):
+        st.text_input("Certification name", key='new_certification')
+        st.button("Add", on_click=add_custom_certification)
     
-    # Domain selection from predefined domains
+    # Domain selection from the domain catalog
     selected_domain = None
     if selected_cert:
-        domains = CERTIFICATION_DOMAINS[selected_cert]
+        try:
+            with st.spinner("Looking up exam domains..."):
+                domains = get_domains(selected_cert)
+        except GenerationError as e:
+            domains = []
+            st.error(f"Domains for {selected_cert} could not be found right now: {e}")
         selected_domain = st.selectbox(
             "Select Domain",
             domains,
@@ -311,16 +365,296 @@ with st.sidebar:
     # Number of cards selection
     num_cards = st.selectbox(
         "Number of Cards",
-        [3, 5, 10]
+        DECK_SIZES
+    )
+
+    # A mock exam covers every domain of the certification, weighted like the real exam
+    exam_size = MOCK_EXAM_SIZE
+    if view_mode == "Mock Exam":
+        exam_size = st.number_input("Exam Questions", min_value=10, max_value=100, value=MOCK_EXAM_SIZE, step=5)
+
+    # Searches every cached card across all certifications and domains
+    search_query = st.text_input("Search All Cards", key="search_query", placeholder="e.g. encryption at rest")
+
+def build_card_html(cards):
+    """Question and answer card HTML for a deck, built once when the deck is loaded."""
+    return [
+        (
+            f"""
+            <div class="card question-card">
+                {card['question']}
+            </div>
+            """,
+            f"""
+            <div class="card answer-card">
+                {card['answer']}
+            </div>
+            """
+        )
+        for card in cards
+    ]
+
+@st.cache_resource(max_entries=256, show_spinner=False)
+def deck_html(deck_id, _deck):
+    """Card HTML for a shared deck, built once per process rather than once per session."""
+    return tuple(build_card_html(_deck))
+
+HIDDEN_ANSWER_HTML = """
+    <div class="card answer-card" style="background-color: #f0f0f0; cursor: pointer;">
+        Click to reveal the answer
+    </div>
+    """
+
+# Two Column View shows the deck one page at a time
+CARDS_PER_PAGE = 10
+
+def render_page_navigation(page_count):
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.session_state.card_page > 0:
+            if st.button("← Previous page", key="prev_page_btn"):
+                st.session_state.card_page -= 1
+                st.rerun()
+    with col2:
+        st.markdown(
+            f'<div class="card-counter">Page {st.session_state.card_page + 1} of {page_count}</div>',
+            unsafe_allow_html=True
+        )
+    with col3:
+        if st.session_state.card_page < page_count - 1:
+            if st.button("Next page →", key="next_page_btn"):
+                st.session_state.card_page += 1
+                st.rerun()
+
+# Button callbacks run before the rerun a click triggers, so they behave the
+# same whether that rerun covers just the fragment or the whole app
+def reveal_card(bit):
+    st.session_state.revealed |= bit
+
+def move_card(step):
+    st.session_state.current_card_index += step
+    st.session_state.show_answer = False
+
+def set_state(name, value):
+    st.session_state[name] = value
+
+def grade_review(learner_id, card_id, quality):
+    record_review(learner_id, st.session_state.scheduler, card_id, quality)
+    st.session_state.show_review_answer = False
+
+def answer_exam(correct):
+    st.session_state.exam_answers.append(correct)
+    st.session_state.exam_index += 1
+    st.session_state.show_exam_answer = False
+
+def timed_fragment(func):
+    """
+    st.fragment that also records each run of its body in rerun_latency.
+    Interactions inside a fragment rerun only the fragment, which the
+    observation at the end of the script never sees.
+    """
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            rerun_latency.observe(seconds, view_mode=view_mode, scope="fragment")
+            trace("fragment_run", fragment=func.__name__, view_mode=view_mode, seconds=round(seconds, 6))
+    return st.fragment(run)
+
+# Card interactions only rerun their own fragment, not the whole script
+@timed_fragment
+def render_two_column_card(i, question_html, answer_html):
+    st.markdown(f"### Card {i}")
+
+    # Create columns for the card
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown(question_html, unsafe_allow_html=True)
+
+    with col2:
+        # Make the answer card clickable
+        bit = 1 << (i - 1)
+        if not st.session_state.revealed & bit:
+            # Show clickable placeholder with tooltip
+            st.button(
+                "Click Me to reveal answer",
+                key=f"reveal_{i}",
+                help="Click here to reveal the answer",
+                type="secondary",
+                on_click=reveal_card,
+                args=(bit,)
+            )
+
+            # Show placeholder card with instruction
+            st.markdown(HIDDEN_ANSWER_HTML, unsafe_allow_html=True)
+        else:
+            # Show revealed answer
+            st.markdown(answer_html, unsafe_allow_html=True)
+
+    st.markdown("---")
+
+@timed_fragment
+def render_carousel(card_html):
+    # Ensure current_card_index is within bounds
+    if st.session_state.current_card_index >= len(card_html):
+        st.session_state.current_card_index = 0
+
+    # Navigation buttons
+    st.markdown('<div class="nav-buttons">', unsafe_allow_html=True)
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+
+    with col1:
+        if st.session_state.current_card_index > 0:
+            st.button("← Previous", key="prev_btn", help="Go to previous card", on_click=move_card, args=(-1,))
+        else:
+            st.markdown(
+                '<button class="nav-button nav-button-disabled" disabled>← Previous</button>',
+                unsafe_allow_html=True
+            )
+
+    # Display current card number with enhanced styling
+    with col2:
+        if card_html:  # Only show counter if we have cards
+            st.markdown(
+                f'<div class="card-counter">Card {st.session_state.current_card_index + 1} of {len(card_html)}</div>',
+                unsafe_allow_html=True
+            )
+
+    with col3:
+        if st.session_state.current_card_index < len(card_html) - 1:
+            st.button("Next →", key="next_btn", help="Go to next card", on_click=move_card, args=(1,))
+        else:
+            st.markdown(
+                '<button class="nav-button nav-button-disabled" disabled>← Next</button>',
+                unsafe_allow_html=True
+            )
+
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    # Safely get current card
+    if 0 <= st.session_state.current_card_index < len(card_html):
+        question_html, answer_html = card_html[st.session_state.current_card_index]
+
+        # Create columns for better button placement
+        content_col, button_col = st.columns([3, 1])
+
+        with content_col:
+            if not st.session_state.show_answer:
+                st.markdown(question_html, unsafe_allow_html=True)
+            else:
+                st.markdown(answer_html, unsafe_allow_html=True)
+
+        with button_col:
+            # Make the answer card clickable
+            if not st.session_state.show_answer:
+                st.button("Click to reveal", key="reveal_carousel", help="Click to reveal the answer",
+                          on_click=set_state, args=("show_answer", True))
+            else:
+                st.button("Show question", key="hide_carousel", help="Click to show the question",
+                          on_click=set_state, args=("show_answer", False))
+    else:
+        st.error("An error occurred while displaying the card. Please try refreshing the page.")
+
+@timed_fragment
+def render_review(learner_id):
+    scheduler = st.session_state.scheduler
+    state = scheduler.next_due()
+    if state is None:
+        upcoming = scheduler.peek()
+        if upcoming is None:
+            st.info("No cards to review yet. Click 'Show Me Flash Cards' to add a deck to your reviews.")
+        else:
+            due = time.strftime('%Y-%m-%d %H:%M', time.localtime(upcoming.due_at))
+            st.success(f"All caught up! Your next review is due {due}.")
+        return
+
+    st.caption(f"{state.certification} · {state.domain} · {len(scheduler)} cards in your reviews")
+    st.markdown(
+        f"""
+        <div class="card question-card">
+            {state.question}
+        </div>
+        """,
+        unsafe_allow_html=True
     )
+    if not st.session_state.get('show_review_answer'):
+        st.button("Reveal Answer", key="reveal_review", on_click=set_state, args=("show_review_answer", True))
+        return
+
+    st.markdown(
+        f"""
+        <div class="card answer-card">
+            {state.answer}
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
+    st.markdown("How well did you remember it?")
+    for col, (label, quality) in zip(st.columns(len(GRADES)), GRADES.items()):
+        with col:
+            st.button(label, key=f"grade_{label}", on_click=grade_review, args=(learner_id, state.card_id, quality))
+
+@timed_fragment
+def render_exam():
+    exam = st.session_state.exam
+    index = st.session_state.exam_index
+    if index >= len(exam):
+        answers = st.session_state.exam_answers
+        score = sum(answers)
+        st.success(f"You scored {score} of {len(exam)} ({score * 100 // len(exam)}%)")
+        by_domain = {}
+        for card, correct in zip(exam, answers):
+            right, total = by_domain.get(card['domain'], (0, 0))
+            by_domain[card['domain']] = (right + correct, total + 1)
+        for domain, (right, total) in by_domain.items():
+            st.markdown(f"- **{domain}**: {right} of {total}")
+        return
+
+    st.markdown(
+        f'<div class="card-counter">Question {index + 1} of {len(exam)}</div>',
+        unsafe_allow_html=True
+    )
+    st.caption(exam[index]['domain'])
+    question_html, answer_html = st.session_state.exam_html[index]
+    st.markdown(question_html, unsafe_allow_html=True)
+    if not st.session_state.show_exam_answer:
+        st.button("Reveal Answer", key="reveal_exam", on_click=set_state, args=("show_exam_answer", True))
+        return
+
+    st.markdown(answer_html, unsafe_allow_html=True)
+    col1, col2 = st.columns(2)
+    for col, label, correct in ((col1, "✅ I got it right", True), (col2, "❌ I got it wrong", False)):
+        with col:
+            st.button(label, key=f"exam_{correct}", on_click=answer_exam, args=(correct,))
+
+if search_query.strip():
+    results = search_cards(search_query)
+    with st.expander(f"🔍 {len(results)} cards matching '{search_query.strip()}'", expanded=True):
+        if not results:
+            st.caption("No generated cards match your search yet.")
+        for result in results:
+            st.markdown(f"**{result['question']}**")
+            st.caption(f"{result['certification']} · {result['domain']}")
+            st.markdown(result['answer'])
+
+# Prefetches for a certification the user has moved away from are no longer useful
+if st.session_state.last_cert is not None and st.session_state.last_cert != selected_cert:
+    cancel_prefetch(st.session_state.session_id)
 
 # Main content
-if selected_cert and selected_domain:
+if selected_cert and selected_domain and view_mode != "Mock Exam":
     # Initialize session states if not exists
-    if 'cards' not in st.session_state:
-        st.session_state.cards = None
-    if 'revealed_answers' not in st.session_state:
-        st.session_state.revealed_answers = set()
+    if 'deck_id' not in st.session_state:
+        st.session_state.deck_id = None
+    if 'deck_size' not in st.session_state:
+        st.session_state.deck_size = 0
+    if 'revealed' not in st.session_state:
+        st.session_state.revealed = 0
     if 'current_card_index' not in st.session_state:
         st.session_state.current_card_index = 0
     if 'show_answer' not in st.session_state:
@@ -332,160 +666,125 @@ if selected_cert and selected_domain:
         # Reset states when explicitly loading new cards
         if (st.session_state.last_cert != selected_cert or 
             st.session_state.last_domain != selected_domain):
-            st.session_state.revealed_answers = set()
+            st.session_state.revealed = 0
             st.session_state.current_card_index = 0
             st.session_state.show_answer = False
+            st.session_state.card_page = 0
         
-        with st.spinner(f"Whizlabs is Generating flash cards for {selected_domain}..."):
-            st.session_state.cards = get_cached_certification_data(
-                selected_cert, selected_domain, num_cards
-            )
-            st.session_state.last_cert = selected_cert
-            st.session_state.last_domain = selected_domain
-
-# Main content
-if st.session_state.initialized and st.session_state.cards:
-    if not st.session_state.cards:
-        st.warning("No flash cards could be generated for this domain. Please try another domain or certification.")
-        st.stop()
-    
-    selected_cards = st.session_state.cards
-    
-    if view_mode == "Two Column View":
-        for i, card in enumerate(selected_cards, 1):
-            st.markdown(f"### Card {i}")
-            
-            # Create columns for the card
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown(
-                    f"""
-                    <div class="card question-card">
-                        {card['question']}
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-            
-            with col2:
-                # Make the answer card clickable
-                card_id = f"card_{i}"
-                if card_id not in st.session_state.revealed_answers:
-                    # Show clickable placeholder with tooltip
-                    if st.button(
-                        "Click Me to reveal answer",
-                        key=f"reveal_{i}",
-                        help="Click here to reveal the answer",
-                        type="secondary"
-                    ):
-                        st.session_state.revealed_answers.add(card_id)
-                        st.rerun()
-                    
-                    # Show placeholder card with instruction
-                    st.markdown(
-                        f"""
-                        <div class="card answer-card" style="background-color: #f0f0f0; cursor: pointer;">
-                            Click to reveal the answer
-                        </div>
-                        """,
-                        unsafe_allow_html=True
-                    )
-                else:
-                    # Show revealed answer
-                    st.markdown(
-                        f"""
-                        <div class="card answer-card">
-                            {card['answer']}
-                        </div>
-                        """,
-                        unsafe_allow_html=True
-                    )
-            
-            st.markdown("---")
-    else:  # Carousel View
-        # Ensure current_card_index is within bounds
-        if st.session_state.current_card_index >= len(selected_cards):
-            st.session_state.current_card_index = 0
-        
-        # Navigation buttons
-        st.markdown('<div class="nav-buttons">', unsafe_allow_html=True)
-        
-        col1, col2, col3 = st.columns([1, 2, 1])
-        
-        with col1:
-            if st.session_state.current_card_index > 0:
-                if st.button("← Previous", key="prev_btn", help="Go to previous card"):
-                    st.session_state.current_card_index -= 1
-                    st.session_state.show_answer = False
-                    st.rerun()
-            else:
-                st.markdown(
-                    '<button class="nav-button nav-button-disabled" disabled>← Previous</button>',
-                    unsafe_allow_html=True
-                )
-        
-        # Display current card number with enhanced styling
-        with col2:
-            if selected_cards:  # Only show counter if we have cards
-                st.markdown(
-                    f'<div class="card-counter">Card {st.session_state.current_card_index + 1} of {len(selected_cards)}</div>',
-                    unsafe_allow_html=True
-                )
-        
-        with col3:
-            if st.session_state.current_card_index < len(selected_cards) - 1:
-                if st.button("Next →", key="next_btn", help="Go to next card"):
-                    st.session_state.current_card_index += 1
-                    st.session_state.show_answer = False
-                    st.rerun()
-            else:
-                st.markdown(
-                    '<button class="nav-button nav-button-disabled" disabled>← Next</button>',
-                    unsafe_allow_html=True
-                )
-        
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Safely get current card
-        if 0 <= st.session_state.current_card_index < len(selected_cards):
-            current_card = selected_cards[st.session_state.current_card_index]
-            
-            # Create columns for better button placement
-            content_col, button_col = st.columns([3, 1])
-            
-            with content_col:
-                if not st.session_state.show_answer:
+        # Render cards as they stream in, then hand over to the full view below
+        preview = st.empty()
+        cards = []
+        generation_error = None
+        with preview.container():
+            st.caption(f"Whizlabs is Generating flash cards for {selected_domain}...")
+            progress = st.empty()
+            try:
+                for card in stream_cached_certification_data(selected_cert, selected_domain, num_cards):
+                    cards.append(card)
+                    # Preview the first page only; beyond that just count
+                    if len(cards) > CARDS_PER_PAGE:
+                        progress.caption(f"{len(cards)} of {num_cards} cards ready...")
+                        continue
+                    st.markdown(f"### Card {len(cards)}")
                     st.markdown(
                         f"""
                         <div class="card question-card">
-                            {current_card['question']}
+                            {card['question']}
                         </div>
                         """,
                         unsafe_allow_html=True
                     )
-                else:
-                    st.markdown(
-                        f"""
-                        <div class="card answer-card">
-                            {current_card['answer']}
-                        </div>
-                        """,
-                        unsafe_allow_html=True
-                    )
-            
-            with button_col:
-                # Make the answer card clickable
-                if not st.session_state.show_answer:
-                    if st.button("Click to reveal", key="reveal_carousel", help="Click to reveal the answer"):
-                        st.session_state.show_answer = True
-                        st.rerun()
-                else:
-                    if st.button("Show question", key="hide_carousel", help="Click to show the question"):
-                        st.session_state.show_answer = False
-                        st.rerun()
+            except GenerationError as e:
+                generation_error = e
+        preview.empty()
+        if generation_error is not None:
+            st.error(f"Flash cards could not be generated right now: {generation_error}")
+        # On a failed generation with nothing to show, the error above is enough
+        if cards or generation_error is None:
+            st.session_state.deck_id = register_deck(selected_cert, selected_domain, cards).deck_id
+            st.session_state.deck_size = len(cards)
         else:
-            st.error("An error occurred while displaying the card. Please try refreshing the page.")
+            st.session_state.deck_id = None
+        st.session_state.last_cert = selected_cert
+        st.session_state.last_domain = selected_domain
+        # Warm the cache for what the user will most likely open next
+        prefetch_likely_next(st.session_state.session_id, selected_cert, selected_domain, num_cards)
+
+# The session's deck, from the process-wide registry; a deck dropped from the
+# registry is rebuilt from the card cache without the learner reloading it
+deck = None
+if st.session_state.deck_id:
+    deck = load_deck(st.session_state.deck_id, st.session_state.last_cert,
+                     st.session_state.last_domain, st.session_state.deck_size)
+    if deck is not None and deck.deck_id != st.session_state.deck_id:
+        # Rebuilt from cards that have changed since; progress on the old ones doesn't apply
+        st.session_state.deck_id = deck.deck_id
+        st.session_state.revealed = 0
+        st.session_state.current_card_index = 0
+        st.session_state.show_answer = False
+        st.session_state.card_page = 0
+
+# Main content
+if view_mode == "Mock Exam":
+    if selected_cert and st.button("Start Mock Exam", type="primary"):
+        exam = None
+        with st.spinner(f"Assembling a {exam_size}-question exam for {selected_cert}..."):
+            try:
+                exam = build_mock_exam(selected_cert, exam_size)
+            except GenerationError as e:
+                st.error(f"The mock exam could not be assembled right now: {e}")
+        if exam:
+            if len(exam) < exam_size:
+                st.warning(f"Only {len(exam)} questions could be prepared right now.")
+            st.session_state.exam = exam
+            st.session_state.exam_html = build_card_html(exam)
+            st.session_state.exam_index = 0
+            st.session_state.exam_answers = []
+            st.session_state.show_exam_answer = False
+    if st.session_state.get('exam'):
+        render_exam()
+    else:
+        st.info("👆 Select a certification and click 'Start Mock Exam' for a full-length practice exam across all its domains.")
+elif view_mode == "Spaced Repetition":
+    learner_id = st.session_state.get('learner_name', '').strip().lower()
+    if not learner_id:
+        st.info("👈 Enter a learner name in the sidebar to start reviewing and save your progress.")
+    else:
+        # The due queue is built from the progress store once per learner per session
+        if st.session_state.get('scheduler_learner') != learner_id:
+            st.session_state.scheduler = load_review_scheduler(learner_id)
+            st.session_state.scheduler_learner = learner_id
+            st.session_state.enrolled_deck = None
+            st.session_state.show_review_answer = False
+        # Cards of the loaded deck join the learner's reviews
+        if deck and st.session_state.get('enrolled_deck') != deck.deck_id:
+            added = enroll_cards(learner_id, st.session_state.scheduler, deck.certification, deck.domain, deck)
+            st.session_state.enrolled_deck = deck.deck_id
+            if added:
+                st.toast(f"Added {added} new cards to your reviews")
+        render_review(learner_id)
+elif st.session_state.initialized and st.session_state.deck_id is not None:
+    if deck is None:
+        # Dropped from the registry and its cards are no longer cached
+        st.info("👆 This deck is no longer loaded. Click 'Show Me Flash Cards' to load it again.")
+        st.stop()
+    if not deck:
+        st.warning("No flash cards could be generated for this domain. Please try another domain or certification.")
+        st.stop()
+
+    card_html = deck_html(deck.deck_id, deck)
+
+    if view_mode == "Two Column View":
+        # Only the current page of the deck is rendered, however large the deck is
+        page_count = -(-len(card_html) // CARDS_PER_PAGE)
+        st.session_state.card_page = min(st.session_state.get('card_page', 0), page_count - 1)
+        first = st.session_state.card_page * CARDS_PER_PAGE
+        for i, (question_html, answer_html) in enumerate(card_html[first:first + CARDS_PER_PAGE], first + 1):
+            render_two_column_card(i, question_html, answer_html)
+        if page_count > 1:
+            render_page_navigation(page_count)
+    else:  # Carousel View
+        render_carousel(card_html)
 else:
     # Show instructions when cards haven't been loaded
     st.info("👆 Select your preferences in the sidebar and click 'Show Me Flash Cards' to start your preparation!")
@@ -495,4 +794,9 @@ st.markdown("""
 <div style='text-align: center; color: #666; padding: 1rem;'>
     Whizlabs ❤️ for certification preparation
 </div>
-""", unsafe_allow_html=True) 
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+script_seconds = time.perf_counter() - script_start
+rerun_latency.observe(script_seconds, view_mode=view_mode, scope="app")
+trace("script_run", view_mode=view_mode, seconds=round(script_seconds, 6),
+      cards=len(deck or ()))
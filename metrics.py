@@ -0,0 +1,283 @@
+"""
+In-process metrics with Prometheus text exposition.
+
+Metrics are registered once per process and are safe to update from any thread.
+Set METRICS_PORT to serve them over HTTP at /metrics, METRICS_FILE to have them
+written to a file periodically, and TRACE_LOG=1 to emit one structured JSON log
+line per traced operation.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Latency buckets in seconds, from a warm cache hit up to a slow model call
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, sum, count)
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labels, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Gauge:
+    """
+    A value read from a callback at exposition time, e.g. cache entry counts.
+    metric_type='counter' exposes a monotonic count kept elsewhere as a counter.
+    """
+
+    def __init__(self, name: str, help_text: str, read, metric_type: str = "gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.metric_type = metric_type
+        self._read = read
+
+    def expose(self) -> List[str]:
+        try:
+            value = self._read()
+        except Exception as e:
+            return [f"# {self.name} unavailable: {_escape(str(e))}"]
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}",
+                f"{self.name} {value}"]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Idempotent, so re-registering a name returns the existing metric
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name: str, help_text: str, read, metric_type: str = "gauge") -> Gauge:
+        return self._register(Gauge(name, help_text, read, metric_type))
+
+    def expose(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+generation_latency = registry.histogram(
+    "whizcards_generate_content_seconds", "Latency of model generate_content calls",
+    labels=("operation", "outcome")
+)
+prompt_tokens = registry.histogram(
+    "whizcards_prompt_tokens", "Prompt tokens per model call", labels=("operation", "prompt_style"),
+    buckets=TOKEN_BUCKETS
+)
+response_tokens = registry.histogram(
+    "whizcards_response_tokens", "Response tokens per model call", labels=("operation", "prompt_style"),
+    buckets=TOKEN_BUCKETS
+)
+parse_latency = registry.histogram(
+    "whizcards_parse_seconds", "Time spent parsing model responses", labels=("format",),
+    buckets=(0.00001, 0.0001, 0.001, 0.005, 0.01, 0.05, 0.1)
+)
+cache_events = registry.counter(
+    "whizcards_cache_events_total", "Cache lookups and evictions", labels=("cache", "event")
+)
+rerun_latency = registry.histogram(
+    "whizcards_script_run_seconds", "main.py execution time per rerun of the whole app or of one fragment",
+    labels=("view_mode", "scope")
+)
+startup_latency = registry.histogram(
+    "whizcards_startup_seconds", "Time from script start to first paint, by phase", labels=("phase",)
+)
+
+TRACE_ENABLED = os.getenv('TRACE_LOG', '').lower() in ('1', 'true', 'yes')
+
+
+def trace(event: str, **fields) -> None:
+    """Write one structured JSON log line to stderr when TRACE_LOG is enabled."""
+    if not TRACE_ENABLED:
+        return
+    record = {"ts": round(time.time(), 6), "event": event, "thread": threading.current_thread().name}
+    record.update(fields)
+    print(json.dumps(record, default=str), file=sys.stderr, flush=True)
+
+
+def usage_counts(response) -> Tuple[Optional[int], Optional[int]]:
+    """(prompt tokens, response tokens) from a response's usage metadata; None where missing."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    if isinstance(usage, dict):
+        prompt_count = usage.get("prompt_token_count")
+        response_count = usage.get("candidates_token_count")
+    else:
+        prompt_count = getattr(usage, "prompt_token_count", None)
+        response_count = getattr(usage, "candidates_token_count", None)
+    return prompt_count, response_count
+
+
+def record_usage(operation: str, response, prompt_style: str = "") -> None:
+    """Record prompt/response token counts from a response's usage metadata, if any."""
+    prompt_count, response_count = usage_counts(response)
+    if prompt_count:
+        prompt_tokens.observe(prompt_count, operation=operation, prompt_style=prompt_style)
+    if response_count:
+        response_tokens.observe(response_count, operation=operation, prompt_style=prompt_style)
+    if prompt_count or response_count:
+        trace("usage", operation=operation, prompt_style=prompt_style,
+              prompt_tokens=prompt_count, response_tokens=response_count)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.expose().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Scrapes every few seconds would otherwise flood the Streamlit log
+        pass
+
+
+_exporter_lock = threading.Lock()
+_exporter_started = False
+
+
+def start_exporters(port: Optional[int] = None, path: Optional[str] = None, interval: float = 15.0) -> None:
+    """
+    Start the HTTP endpoint and/or periodic file writer once per process.
+    Defaults come from METRICS_PORT and METRICS_FILE; nothing starts if neither is set.
+    """
+    global _exporter_started
+    port = port if port is not None else (int(os.environ['METRICS_PORT']) if os.getenv('METRICS_PORT') else None)
+    path = path or os.getenv('METRICS_FILE')
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+
+    if port is not None:
+        try:
+            server = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+        except OSError as e:
+            # Another worker process on this host already serves the port
+            print(f"Metrics endpoint not started on port {port}: {str(e)}")
+        else:
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+
+    if path:
+        def write_periodically() -> None:
+            while True:
+                tmp_path = f"{path}.tmp"
+                try:
+                    with open(tmp_path, "w") as f:
+                        f.write(registry.expose())
+                    os.replace(tmp_path, path)
+                except OSError as e:
+                    print(f"Error writing metrics to {path}: {str(e)}")
+                time.sleep(interval)
+
+        threading.Thread(target=write_periodically, name="metrics-file", daemon=True).start()
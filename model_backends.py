@@ -0,0 +1,306 @@
+"""
+Model backends for GeminiService.
+
+A backend is any object with a ``generate_content(prompt, stream=False,
+generation_config=None)`` method returning a response with ``.text`` that can
+also be iterated as streamed chunks, the same shape as the google-generativeai
+SDK's ``GenerativeModel``. Backends may also provide ``generate_content_async``
+with the same arguments, whose streamed responses are iterated with
+``async for``. ``MockModel`` is a deterministic local stand-in used for offline
+development, tests and benchmarks.
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Protocol, Tuple
+
+
+class ModelBackend(Protocol):
+    def generate_content(self, prompt: str, stream: bool = False,
+                         generation_config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        ...
+
+
+# Structured (JSON) output, used for batched generation, needs a 1.5 or later model
+DEFAULT_GEMINI_MODEL = 'gemini-1.5-flash'
+
+
+def create_gemini_model(api_key: str, model_name: Optional[str] = None) -> ModelBackend:
+    """
+    The real Gemini model, GEMINI_MODEL unless model_name is given. The SDK is
+    only imported here, when it is actually needed.
+    """
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel(model_name or os.getenv('GEMINI_MODEL', DEFAULT_GEMINI_MODEL))
+
+
+def create_model_backend(api_key: Optional[str] = None) -> ModelBackend:
+    """
+    Build the backend selected by GEMINI_BACKEND: 'gemini' (default) or 'mock'.
+    The mock's behaviour is picked with MOCK_GEMINI_PROFILE (see MOCK_PROFILES).
+    """
+    backend = os.getenv('GEMINI_BACKEND', 'gemini').lower()
+    if backend == 'mock':
+        return MockModel.from_profile(os.getenv('MOCK_GEMINI_PROFILE', 'realistic'))
+    if backend != 'gemini':
+        raise ValueError(f"Unknown GEMINI_BACKEND '{backend}', expected 'gemini' or 'mock'")
+    if not api_key:
+        raise ValueError("A Gemini API key is required for the 'gemini' backend")
+    return create_gemini_model(api_key)
+
+
+class MockServiceUnavailable(Exception):
+    """Injected transient failure, shaped like google.api_core's ServiceUnavailable."""
+    code = 503
+
+
+class MockResourceExhausted(Exception):
+    """Injected quota error, shaped like google.api_core's ResourceExhausted."""
+    code = 429
+
+
+class MockResponse:
+    """A complete or streamed mock response. Iterating yields the streamed chunks."""
+
+    def __init__(self, text: str, chunks: Optional[List[str]] = None, chunk_delays: Optional[List[float]] = None):
+        self.text = text
+        self._chunks = chunks if chunks is not None else [text]
+        self._chunk_delays = chunk_delays or [0.0] * len(self._chunks)
+        self.usage_metadata = {
+            "prompt_token_count": 0,
+            "candidates_token_count": _estimate_tokens(text),
+        }
+
+    def __iter__(self) -> Iterator['MockResponse']:
+        for chunk, delay in zip(self._chunks, self._chunk_delays):
+            if delay:
+                time.sleep(delay)
+            yield MockResponse(chunk)
+
+    async def __aiter__(self) -> AsyncIterator['MockResponse']:
+        for chunk, delay in zip(self._chunks, self._chunk_delays):
+            if delay:
+                await asyncio.sleep(delay)
+            yield MockResponse(chunk)
+
+
+def _estimate_tokens(text: str) -> int:
+    # Roughly four characters per token, like Gemini's English text
+    return max(1, len(text) // 4)
+
+
+# Named latency/error profiles, selectable with MOCK_GEMINI_PROFILE
+MOCK_PROFILES: Dict[str, Dict[str, Any]] = {
+    "instant": {},
+    "realistic": {"latency_mean": 1.5, "latency_sigma": 0.4, "per_card_latency": 0.25,
+                  "chunk_interval": 0.15},
+    "slow-tail": {"latency_mean": 1.0, "latency_sigma": 0.9, "per_card_latency": 0.2,
+                  "chunk_interval": 0.1},
+    "flaky": {"latency_mean": 1.0, "latency_sigma": 0.4, "per_card_latency": 0.2,
+              "chunk_interval": 0.1, "error_rate": 0.2},
+    "throttled": {"latency_mean": 1.0, "latency_sigma": 0.3, "per_card_latency": 0.2,
+                  "chunk_interval": 0.1, "quota_per_minute": 15},
+}
+
+
+class MockModel:
+    """
+    Deterministic local stand-in for a Gemini GenerativeModel.
+
+    Output depends only on the seed and the prompt, so repeated runs are
+    reproducible. Flashcard prompts get Q:/A: text (or JSON when a JSON
+    response_mime_type is requested) and domain prompts get a domain list.
+
+    Output is cut off at ``max_output_tokens`` when the generation config sets
+    it. Latency is log-normal around latency_mean seconds (latency_sigma = 0
+    makes it fixed) plus per_card_latency per output piece (a card, a domain or
+    a JSON fragment). Streamed responses split the output into per-card chunks
+    spaced chunk_interval seconds apart. error_rate injects transient 503
+    errors and quota_per_minute raises 429 errors once the sliding one-minute
+    window is full.
+    """
+
+    def __init__(self, seed: int = 0, latency_mean: float = 0.0, latency_sigma: float = 0.0,
+                 per_card_latency: float = 0.0, chunk_interval: float = 0.0, error_rate: float = 0.0,
+                 quota_per_minute: Optional[int] = None):
+        self.seed = seed
+        self.latency_mean = latency_mean
+        self.latency_sigma = latency_sigma
+        self.per_card_latency = per_card_latency
+        self.chunk_interval = chunk_interval
+        self.error_rate = error_rate
+        self.quota_per_minute = quota_per_minute
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._call_times: Deque[float] = deque()
+        # Separate stream so injected errors don't change the generated content
+        self._error_random = random.Random(seed)
+
+    @classmethod
+    def from_profile(cls, name: str, seed: int = 0) -> 'MockModel':
+        if name not in MOCK_PROFILES:
+            raise ValueError(f"Unknown mock profile '{name}', expected one of {', '.join(MOCK_PROFILES)}")
+        return cls(seed=seed, **MOCK_PROFILES[name])
+
+    def generate_content(self, prompt: str, stream: bool = False,
+                         generation_config: Optional[Dict[str, Any]] = None, **kwargs: Any) -> MockResponse:
+        response, delay = self._respond(prompt, stream, generation_config)
+        if delay:
+            time.sleep(delay)
+        return response
+
+    async def generate_content_async(self, prompt: str, stream: bool = False,
+                                     generation_config: Optional[Dict[str, Any]] = None,
+                                     **kwargs: Any) -> MockResponse:
+        """Like the SDK's generate_content_async: waits without blocking the event loop."""
+        response, delay = self._respond(prompt, stream, generation_config)
+        if delay:
+            await asyncio.sleep(delay)
+        return response
+
+    def _respond(self, prompt: str, stream: bool,
+                 generation_config: Optional[Dict[str, Any]]) -> Tuple[MockResponse, float]:
+        """The response for a prompt and how long to wait before returning it."""
+        self._check_quota_and_errors()
+        rng = random.Random(self.seed ^ zlib.crc32(prompt.encode('utf-8')))
+        config = generation_config or {}
+
+        if config.get("response_mime_type") == "application/json":
+            chunks = self._json_batch(prompt, rng)
+        elif "flash cards" in prompt:
+            chunks = self._flashcards(prompt, rng)
+        else:
+            chunks = self._domains(prompt, rng)
+
+        if config.get("max_output_tokens"):
+            chunks = _truncate(chunks, config["max_output_tokens"])
+        text = "".join(chunks)
+        latency = self._base_latency(rng)
+        if not stream:
+            delay = latency + self.per_card_latency * max(1, len(chunks))
+            response = MockResponse(text)
+        else:
+            # First chunk arrives after the base latency, the rest one interval apart
+            delay = 0.0
+            delays = [latency + self.per_card_latency] + [self.chunk_interval + self.per_card_latency] * (len(chunks) - 1)
+            response = MockResponse(text, chunks, delays)
+        response.usage_metadata["prompt_token_count"] = _estimate_tokens(prompt)
+        return response, delay
+
+    def _check_quota_and_errors(self) -> None:
+        with self._lock:
+            self.calls += 1
+            now = time.monotonic()
+            if self.quota_per_minute is not None:
+                while self._call_times and now - self._call_times[0] > 60:
+                    self._call_times.popleft()
+                if len(self._call_times) >= self.quota_per_minute:
+                    raise MockResourceExhausted("429 Quota exceeded for generate_content requests per minute")
+                self._call_times.append(now)
+            if self.error_rate and self._error_random.random() < self.error_rate:
+                raise MockServiceUnavailable("503 The model is overloaded. Please try again later.")
+
+    def _base_latency(self, rng: random.Random) -> float:
+        if self.latency_mean <= 0:
+            return 0.0
+        if self.latency_sigma <= 0:
+            return self.latency_mean
+        # Log-normal with the requested mean: mu = ln(mean) - sigma^2 / 2
+        mu = math.log(self.latency_mean) - self.latency_sigma ** 2 / 2
+        return rng.lognormvariate(mu, self.latency_sigma)
+
+    def _flashcards(self, prompt: str, rng: random.Random) -> List[str]:
+        count = _requested_count(prompt)
+        topic = _match(r"for the (.+?) domain", prompt) or "the exam"
+        return [
+            f"Q: {_question(topic, rng)}\nA: {_answer(topic, rng)}\n\n"
+            for _ in range(count)
+        ]
+
+    def _json_batch(self, prompt: str, rng: random.Random) -> List[str]:
+        count = _requested_count(prompt)
+        domains = [line.strip()[2:].strip() for line in prompt.splitlines() if line.strip().startswith("- ")]
+        payload = {"domains": [
+            {"domain": domain, "cards": [
+                {"question": _question(domain, rng), "answer": _answer(domain, rng)}
+                for _ in range(count)
+            ]}
+            for domain in domains
+        ]}
+        text = json.dumps(payload)
+        # Stream JSON in fixed-size pieces; it is only usable once complete anyway
+        return [text[i:i + 200] for i in range(0, len(text), 200)] or [text]
+
+    def _domains(self, prompt: str, rng: random.Random) -> List[str]:
+        certification = _match(r"for the (.+?) certification", prompt) or "the certification"
+        areas = ["Fundamentals", "Architecture and Design", "Security and Compliance",
+                 "Operations and Monitoring", "Cost Management", "Data and Analytics"]
+        picked = rng.sample(areas, rng.randint(4, len(areas)))
+        return [f"{area} for {certification}\n" for area in picked]
+
+
+_QUESTION_TEMPLATES = [
+    "What is the primary purpose of {concept} in {topic}?",
+    "Which {concept} best practice is recommended for {topic}?",
+    "How does {concept} differ from {other} in {topic}?",
+    "When should you choose {concept} over {other} for {topic}?",
+    "What are the key benefits of {concept} within {topic}?",
+]
+_ANSWER_TEMPLATES = [
+    "{concept} provides {benefit}, which is central to {topic}.",
+    "Use {concept} to achieve {benefit}; {other} is better suited to different workloads.",
+    "{concept} focuses on {benefit}, while {other} addresses a different concern.",
+]
+_CONCEPTS = [
+    "access control", "encryption at rest", "autoscaling", "data lineage", "model monitoring",
+    "least privilege", "high availability", "cost allocation tags", "batch inference",
+    "feature engineering", "network segmentation", "prompt engineering", "fine-tuning",
+    "disaster recovery", "observability", "data governance", "vector search", "caching",
+]
+_BENEFITS = [
+    "reduced operational overhead", "stronger security guarantees", "lower latency",
+    "predictable costs", "better fault tolerance", "auditability", "faster iteration",
+]
+
+
+def _question(topic: str, rng: random.Random) -> str:
+    concept, other = rng.sample(_CONCEPTS, 2)
+    return rng.choice(_QUESTION_TEMPLATES).format(concept=concept, other=other, topic=topic)
+
+
+def _answer(topic: str, rng: random.Random) -> str:
+    concept, other = rng.sample(_CONCEPTS, 2)
+    return rng.choice(_ANSWER_TEMPLATES).format(
+        concept=concept.capitalize(), other=other, topic=topic, benefit=rng.choice(_BENEFITS)
+    )
+
+
+def _truncate(chunks: List[str], max_tokens: int) -> List[str]:
+    """Cut output off at max_tokens, as the real model does when it hits max_output_tokens."""
+    budget = max_tokens * 4
+    kept = []
+    for chunk in chunks:
+        if budget <= 0:
+            break
+        kept.append(chunk[:budget])
+        budget -= len(chunk)
+    return kept
+
+
+def _requested_count(prompt: str) -> int:
+    count = _match(r"(\d+) (?:flash )?cards", prompt)
+    return int(count) if count else 5
+
+
+def _match(pattern: str, text: str) -> Optional[str]:
+    found = re.search(pattern, text)
+    return found.group(1).strip() if found else None
+
@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, Iterable, Set
+
+
+class Prefetcher:
+    """
+    Warms the card cache in the background for decks a user is likely to open next.
+
+    Work runs on a small dedicated pool so it never occupies the threads serving
+    foreground requests. A global budget caps how many prefetches may be queued or
+    running at once; anything beyond it is dropped rather than queued. Each session
+    has a scope (its current certification): scheduling under a new scope, or
+    calling cancel(), discards that session's prefetches that haven't started yet.
+    """
+
+    def __init__(self, fetch: Callable[..., object], max_workers: int = 2, budget: int = 8):
+        self._fetch = fetch
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._budget = threading.BoundedSemaphore(budget)
+        self._lock = threading.Lock()
+        self._pending: Set[Hashable] = set()
+        # session id -> (scope, generation, queued); bumping the generation cancels
+        # queued work. Only sessions with work queued or running have an entry.
+        self._sessions: Dict[str, tuple] = {}
+        self.scheduled = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.dropped = 0
+
+    def schedule(self, session_id: str, scope: Hashable, keys: Iterable[tuple]) -> None:
+        """Queue fetch(*key) for each key on behalf of a session."""
+        accepted = []
+        with self._lock:
+            current_scope, generation, queued = self._sessions.get(session_id, (None, 0, 0))
+            if current_scope != scope:
+                generation += 1
+            for key in keys:
+                if key in self._pending:
+                    continue
+                if not self._budget.acquire(blocking=False):
+                    self.dropped += 1
+                    continue
+                self._pending.add(key)
+                self.scheduled += 1
+                accepted.append(key)
+            if queued + len(accepted):
+                self._sessions[session_id] = (scope, generation, queued + len(accepted))
+            else:
+                # Nothing queued for this session, so nothing to cancel later
+                self._sessions.pop(session_id, None)
+
+        for key in accepted:
+            self._executor.submit(self._run, session_id, generation, key)
+
+    def cancel(self, session_id: str) -> None:
+        """Drop a session's prefetches that haven't started yet."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                _, generation, queued = entry
+                self._sessions[session_id] = (None, generation + 1, queued)
+
+    def _run(self, session_id: str, generation: int, key: tuple) -> None:
+        try:
+            with self._lock:
+                _, current, _ = self._sessions[session_id]
+                if current != generation:
+                    self.cancelled += 1
+                    return
+            try:
+                self._fetch(*key)
+            except Exception as e:
+                print(f"Error prefetching {key}: {str(e)}")
+                return
+            with self._lock:
+                self.completed += 1
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+                # The session's last queued prefetch takes its entry with it
+                scope, current, queued = self._sessions[session_id]
+                if queued > 1:
+                    self._sessions[session_id] = (scope, current, queued - 1)
+                else:
+                    del self._sessions[session_id]
+            self._budget.release()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "scheduled": self.scheduled,
+                "completed": self.completed,
+                "cancelled": self.cancelled,
+                "dropped": self.dropped,
+                "pending": len(self._pending),
+                "sessions": len(self._sessions),
+            }
@@ -0,0 +1,112 @@
+"""
+Pre-generate flash cards for every predefined certification domain and write
+them to a card pack that data.py loads at startup.
+
+Usage:
+    python pregenerate.py [--output card_pack.bin] [--workers 4] [--num-cards 10]
+
+Completed domains are recorded in <output>.partial as they finish, so an
+interrupted run picks up where it left off when started again.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List
+
+from card_pack import write_card_pack
+from gemini_client import GenerationError
+from data import CARD_PACK_PATH, CERTIFICATION_DOMAINS, DECK_SIZES, generate_unique_deck, get_gemini_service
+
+
+def load_progress(partial_path: str) -> Dict[str, Dict[str, List[Dict[str, str]]]]:
+    """Read decks completed by a previous, interrupted run."""
+    decks = {}
+    if not os.path.exists(partial_path):
+        return decks
+    with open(partial_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn final line from a crash; that domain is simply redone
+                continue
+            decks.setdefault(entry["certification"], {})[entry["domain"]] = entry["cards"]
+    return decks
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-generate a flash card pack.")
+    parser.add_argument("--output", default=CARD_PACK_PATH, help="card pack file to write")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent Gemini calls")
+    parser.add_argument("--num-cards", type=int, default=max(DECK_SIZES),
+                        help="cards per domain; smaller decks are served by slicing")
+    parser.add_argument("--certification", action="append", choices=list(CERTIFICATION_DOMAINS),
+                        help="only generate this certification (can be repeated)")
+    parser.add_argument("--no-resume", action="store_true", help="ignore progress from a previous run")
+    args = parser.parse_args()
+
+    partial_path = f"{args.output}.partial"
+    if args.no_resume and os.path.exists(partial_path):
+        os.remove(partial_path)
+    decks = load_progress(partial_path)
+
+    certifications = args.certification or list(CERTIFICATION_DOMAINS)
+    tasks = [
+        (certification, domain)
+        for certification in certifications
+        for domain in CERTIFICATION_DOMAINS[certification]
+        if domain not in decks.get(certification, {})
+    ]
+    total = sum(len(CERTIFICATION_DOMAINS[c]) for c in certifications)
+    print(f"{total - len(tasks)} of {total} domains already done, generating {len(tasks)}")
+
+    failed = []
+    start = time.time()
+    try:
+        # Fail fast on a missing API key before scheduling any work
+        get_gemini_service()
+    except GenerationError as e:
+        print(str(e))
+        raise SystemExit(1)
+    with open(partial_path, 'a', encoding='utf-8') as progress, \
+            ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(generate_unique_deck, certification, domain, args.num_cards):
+                (certification, domain)
+            for certification, domain in tasks
+        }
+        for future in as_completed(futures):
+            certification, domain = futures[future]
+            try:
+                cards = future.result()
+            except GenerationError as e:
+                failed.append((certification, domain))
+                print(f"  failed: {certification} / {domain}: {str(e)}")
+                continue
+            if not cards:
+                failed.append((certification, domain))
+                print(f"  no cards: {certification} / {domain}")
+                continue
+            decks.setdefault(certification, {})[domain] = cards
+            progress.write(json.dumps(
+                {"certification": certification, "domain": domain, "cards": cards}
+            ) + "\n")
+            progress.flush()
+            print(f"  {len(cards)} cards: {certification} / {domain}")
+
+    if failed:
+        print(f"{len(failed)} domains failed; run again to retry them before the pack is written")
+        raise SystemExit(1)
+
+    write_card_pack(args.output, decks, metadata={
+        "created_at": time.time(),
+        "num_cards": args.num_cards,
+    })
+    os.remove(partial_path)
+    print(f"Wrote {args.output} in {time.time() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
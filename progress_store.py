@@ -0,0 +1,112 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from srs import ReviewState
+
+_COLUMNS = ("card_id", "certification", "domain", "question", "answer",
+            "easiness", "interval_days", "repetitions", "due_at", "reviewed_at")
+
+
+class ProgressStore:
+    """
+    Persistent per-learner spaced-repetition progress, stored in SQLite (WAL mode).
+
+    Writes are buffered and flushed in one transaction once `batch_size` states
+    are pending or `flush_interval` seconds have passed since the last flush,
+    and on interpreter exit.
+    """
+
+    def __init__(self, path: str, batch_size: int = 20, flush_interval: float = 10.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # (user_id, card_id) -> latest state; later writes for a card replace earlier ones
+        self._pending: Dict[Tuple[str, str], ReviewState] = {}
+        self._last_flush = time.monotonic()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS progress (
+                user_id TEXT NOT NULL,
+                card_id TEXT NOT NULL,
+                certification TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                easiness REAL NOT NULL,
+                interval_days REAL NOT NULL,
+                repetitions INTEGER NOT NULL,
+                due_at REAL NOT NULL,
+                reviewed_at REAL,
+                PRIMARY KEY (user_id, card_id)
+            )
+            """
+        )
+        atexit.register(self.flush)
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, user_id: str) -> List[ReviewState]:
+        """All of a learner's cards, including writes still waiting to be flushed."""
+        rows = self._connection().execute(
+            f"SELECT {', '.join(_COLUMNS)} FROM progress WHERE user_id = ?", (user_id,)
+        ).fetchall()
+        states = {row[0]: ReviewState(*row) for row in rows}
+        with self._lock:
+            for (pending_user, card_id), state in self._pending.items():
+                if pending_user == user_id:
+                    states[card_id] = state
+        return list(states.values())
+
+    def save(self, user_id: str, states: List[ReviewState]) -> None:
+        """Queue states for writing, flushing if the batch is full or old enough."""
+        with self._lock:
+            for state in states:
+                self._pending[(user_id, state.card_id)] = state
+            due = (len(self._pending) >= self.batch_size
+                   or time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        rows = [
+            (user_id,) + tuple(getattr(state, column) for column in _COLUMNS)
+            for (user_id, _), state in pending.items()
+        ]
+        conn = self._connection()
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO progress (user_id, {', '.join(_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(_COLUMNS) + 1))})",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            # Put the batch back so it is retried on the next flush
+            with self._lock:
+                for key, state in pending.items():
+                    self._pending.setdefault(key, state)
+            raise
@@ -0,0 +1,114 @@
+"""
+Prompt templates and generation configs for GeminiService.
+
+Two prompt styles are available, selected with GEMINI_PROMPT_STYLE or
+GeminiService(prompt_style=...):
+
+- ``compact`` (default): short instructions, and ``max_output_tokens`` sized
+  from the number of cards requested, so output length (and with it latency)
+  is bounded.
+- ``verbose``: the original free-text prompts with no output limit, kept for
+  A/B comparison (see benchmarks/bench_prompts.py).
+"""
+import os
+from typing import Any, Dict, List, Optional
+
+PROMPT_STYLES = ("compact", "verbose")
+
+# Output budget per card: a Q:/A: pair is typically 40-70 tokens; the headroom
+# keeps long answers from being cut off mid-card
+TOKENS_PER_CARD = 96
+TOKENS_PER_JSON_CARD = 112
+TOKENS_PER_JSON_DOMAIN = 32
+TOKENS_FOR_DOMAIN_LIST = 256
+TOKEN_OVERHEAD = 64
+# Never ask for more than the model can produce in one response
+MAX_OUTPUT_TOKENS = int(os.getenv('GEMINI_MAX_OUTPUT_TOKENS', 8192))
+
+
+def default_style() -> str:
+    style = os.getenv('GEMINI_PROMPT_STYLE', 'compact').lower()
+    if style not in PROMPT_STYLES:
+        raise ValueError(f"Unknown GEMINI_PROMPT_STYLE '{style}', expected one of {', '.join(PROMPT_STYLES)}")
+    return style
+
+
+def domains_prompt(style: str, certification: str) -> str:
+    if style == "verbose":
+        return f"""
+        List the main domains/topics for the {certification} certification.
+        Return only the domain names as a simple list without any additional text or numbers.
+        These should be the actual exam domains from the official certification guide.
+        """
+    return (f"List the official exam domains for the {certification} certification, "
+            f"one per line, names only.")
+
+
+def flashcards_prompt(style: str, certification: str, domain: str, num_cards: int,
+                      exclude_questions: Optional[List[str]] = None) -> str:
+    if style == "verbose":
+        exclusions = ""
+        if exclude_questions:
+            # Used when topping up an existing deck, so the new cards don't repeat it
+            listed = "\n".join(f"        - {question}" for question in exclude_questions)
+            exclusions = f"""
+        Do not repeat or rephrase any of these existing questions:
+{listed}
+"""
+        return f"""
+        Create {num_cards} flash cards for the {domain} domain of {certification} certification.
+        Each card should have a question and answer format.
+        Focus on important concepts and key points that are likely to appear in the actual certification exam.
+        Format each card as:
+        Q: [Question]
+        A: [Answer]
+{exclusions}
+        Make sure each question-answer pair is separated by a newline.
+        """
+
+    prompt = (f"Write {num_cards} flash cards for the {domain} domain of the {certification} certification, "
+              f"on key exam concepts. Format each as:\nQ: <question>\nA: <answer>\n"
+              f"Separate cards with a blank line. Keep answers to one or two sentences. No other text.")
+    if exclude_questions:
+        listed = "\n".join(f"- {question}" for question in exclude_questions)
+        prompt += f"\nDon't repeat or rephrase these questions:\n{listed}"
+    return prompt
+
+
+def flashcard_batch_prompt(style: str, certification: str, domains: List[str], num_cards: int) -> str:
+    if style == "verbose":
+        domain_list = "\n".join(f"- {domain}" for domain in domains)
+        return f"""
+        Create {num_cards} flash cards for each of the following domains of the {certification} certification:
+        {domain_list}
+        Focus on important concepts and key points that are likely to appear in the actual certification exam.
+        Return one entry per domain, using the domain name exactly as given, each with its question and answer cards.
+        """
+    domain_list = "\n".join(f"- {domain}" for domain in domains)
+    return (f"Write {num_cards} flash cards on key exam concepts for each of these domains of the "
+            f"{certification} certification:\n{domain_list}\n"
+            f"Use each domain name exactly as given. Keep answers to one or two sentences.")
+
+
+def _limit(tokens: int) -> int:
+    return min(MAX_OUTPUT_TOKENS, tokens + TOKEN_OVERHEAD)
+
+
+def domains_config(style: str) -> Optional[Dict[str, Any]]:
+    if style == "verbose":
+        return None
+    return {"max_output_tokens": _limit(TOKENS_FOR_DOMAIN_LIST)}
+
+
+def flashcards_config(style: str, num_cards: int) -> Optional[Dict[str, Any]]:
+    if style == "verbose":
+        return None
+    return {"max_output_tokens": _limit(num_cards * TOKENS_PER_CARD)}
+
+
+def flashcard_batch_config(style: str, num_domains: int, num_cards: int,
+                           schema: Dict[str, Any]) -> Dict[str, Any]:
+    config = {"response_mime_type": "application/json", "response_schema": schema}
+    if style != "verbose":
+        config["max_output_tokens"] = _limit(num_domains * (num_cards * TOKENS_PER_JSON_CARD + TOKENS_PER_JSON_DOMAIN))
+    return config
@@ -0,0 +1,187 @@
+import heapq
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from srs import card_id
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Too common in flash cards to help rank them
+_STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "is", "are", "what",
+    "which", "how", "does", "do", "you", "your", "with", "when", "why", "that", "this",
+    "it", "be", "by", "as", "can", "from", "at",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+class CardSearchIndex:
+    """
+    Full-text BM25 index over every card that enters the card cache.
+
+    Cards and their term frequencies are persisted in SQLite; the inverted index
+    (term -> {doc: tf}) is held in memory so queries never touch disk. It is
+    loaded on the first search rather than at startup; after that, cards indexed
+    by other worker processes are picked up incrementally on the next search. A card is identified by its certification, domain and question, so
+    re-indexing a grown deck only adds the new cards.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._docs: Dict[int, Dict[str, str]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._card_ids: Dict[str, int] = {}
+        self._total_length = 0
+        self._last_doc = 0
+        self._loaded = False
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS documents (
+                doc_id INTEGER PRIMARY KEY,
+                card_id TEXT NOT NULL UNIQUE,
+                certification TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                length INTEGER NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL,
+                doc_id INTEGER NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)
+            )
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA busy_timeout=30000")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._docs)
+
+    def _sync(self) -> None:
+        """Load documents written since the last sync, by this or another process."""
+        conn = self._connection()
+        with self._lock:
+            last_doc = self._last_doc
+        # Cheap check on the rowid index, so a search with nothing new stays in memory
+        max_doc = conn.execute("SELECT MAX(doc_id) FROM documents").fetchone()[0] or 0
+        if max_doc <= last_doc:
+            self._loaded = True
+            return
+        # Both reads stop at max_doc: a document and its postings are committed
+        # together, so cards added after the check can't leave postings without
+        # their document
+        docs = conn.execute(
+            "SELECT doc_id, card_id, certification, domain, question, answer, length "
+            "FROM documents WHERE doc_id > ? AND doc_id <= ?", (last_doc, max_doc)
+        ).fetchall()
+        postings = conn.execute(
+            "SELECT term, doc_id, tf FROM postings WHERE doc_id > ? AND doc_id <= ?", (last_doc, max_doc)
+        ).fetchall()
+        with self._lock:
+            self._loaded = True
+            for doc_id, cid, certification, domain, question, answer, length in docs:
+                if doc_id in self._docs:
+                    continue
+                self._docs[doc_id] = {"certification": certification, "domain": domain,
+                                      "question": question, "answer": answer}
+                self._card_ids[cid] = doc_id
+                self._lengths[doc_id] = length
+                self._total_length += length
+                self._last_doc = max(self._last_doc, doc_id)
+            for term, doc_id, tf in postings:
+                self._postings.setdefault(term, {})[doc_id] = tf
+
+    def add_cards(self, certification: str, domain: str, cards: List[Dict[str, str]]) -> int:
+        """Index cards not seen before. Returns how many were added."""
+        with self._lock:
+            new_cards = {}
+            for card in cards:
+                cid = card_id(certification, domain, card['question'])
+                if cid not in self._card_ids:
+                    new_cards[cid] = card
+        if not new_cards:
+            return 0
+
+        conn = self._connection()
+        added = 0
+        conn.execute("BEGIN")
+        try:
+            for cid, card in new_cards.items():
+                terms = Counter(tokenize(f"{card['question']} {card['answer']}"))
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO documents (card_id, certification, domain, question, answer, length) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (cid, certification, domain, card['question'], card['answer'], sum(terms.values()))
+                )
+                if not cursor.rowcount:
+                    # Already indexed by another process; picked up by the next sync
+                    continue
+                conn.executemany(
+                    "INSERT INTO postings (term, doc_id, tf) VALUES (?, ?, ?)",
+                    [(term, cursor.lastrowid, tf) for term, tf in terms.items()]
+                )
+                added += 1
+            conn.execute("COMMIT")
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        # Until the first search there is nothing in memory to keep up to date
+        if self._loaded:
+            self._sync()
+        return added
+
+    def search(self, query: str, limit: int = 20, certification: Optional[str] = None) -> List[Dict]:
+        """Best matching cards for query by BM25 score, optionally within one certification."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        self._sync()
+        with self._lock:
+            doc_count = len(self._docs)
+            if not doc_count:
+                return []
+            average_length = self._total_length / doc_count
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            if certification is not None:
+                scores = {doc_id: score for doc_id, score in scores.items()
+                          if self._docs[doc_id]["certification"] == certification}
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [dict(self._docs[doc_id], score=round(score, 3)) for doc_id, score in best]
@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls that share a key.
+
+    The first caller for a key runs the function; callers arriving while it is
+    still in flight wait on the same future and get the same result (or error).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def join(self, key: str) -> Tuple[Future, bool]:
+        """
+        Return the future for key and whether the caller is the leader. The
+        leader must resolve it with complete(); everyone else waits on it.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            self.calls += 1
+            return future, True
+
+    def complete(self, key: str, result: Any = None, error: Optional[BaseException] = None) -> None:
+        """Publish the leader's result (or error) to every waiter for key."""
+        with self._lock:
+            future = self._in_flight.pop(key)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        return self.call(key, fn)[0]
+
+    def call(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """do(), also returning whether this caller ran fn itself."""
+        future, leader = self.join(key)
+        if not leader:
+            return future.result(), False
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self.complete(key, error=e)
+            raise
+        self.complete(key, result=result)
+        return result, True
+
+    def stats(self) -> Dict[str, int]:
+        """Number of calls actually executed and number coalesced onto them."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._in_flight),
+            }
@@ -0,0 +1,125 @@
+import hashlib
+import heapq
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DAY_SECONDS = 24 * 3600
+
+# Answer grades offered in the UI, on SM-2's 0-5 quality scale
+GRADES = {"Again": 1, "Hard": 3, "Good": 4, "Easy": 5}
+
+
+def card_id(certification: str, domain: str, question: str) -> str:
+    """Stable id for a card, independent of which deck or session it came from."""
+    digest = hashlib.sha1(f"{certification}\n{domain}\n{question.strip()}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class ReviewState:
+    """A card's content plus its SM-2 scheduling state for one learner."""
+
+    __slots__ = ("card_id", "certification", "domain", "question", "answer",
+                 "easiness", "interval_days", "repetitions", "due_at", "reviewed_at")
+
+    def __init__(self, card_id: str, certification: str, domain: str, question: str, answer: str,
+                 easiness: float = 2.5, interval_days: float = 0.0, repetitions: int = 0,
+                 due_at: float = 0.0, reviewed_at: Optional[float] = None):
+        self.card_id = card_id
+        self.certification = certification
+        self.domain = domain
+        self.question = question
+        self.answer = answer
+        self.easiness = easiness
+        self.interval_days = interval_days
+        self.repetitions = repetitions
+        self.due_at = due_at
+        self.reviewed_at = reviewed_at
+
+    @classmethod
+    def new(cls, certification: str, domain: str, card: Dict[str, str], now: Optional[float] = None) -> 'ReviewState':
+        """A card the learner hasn't reviewed yet; it is due immediately."""
+        return cls(card_id(certification, domain, card['question']), certification, domain,
+                   card['question'], card['answer'], due_at=now if now is not None else time.time())
+
+
+def sm2(state: ReviewState, quality: int, now: Optional[float] = None) -> ReviewState:
+    """Return the state after a review graded quality (0-5), per the SM-2 algorithm."""
+    now = now if now is not None else time.time()
+    if quality < 3:
+        # Forgotten: start the repetition sequence over
+        repetitions = 0
+        interval_days = 1.0
+    else:
+        repetitions = state.repetitions + 1
+        if repetitions == 1:
+            interval_days = 1.0
+        elif repetitions == 2:
+            interval_days = 6.0
+        else:
+            interval_days = round(state.interval_days * state.easiness, 2)
+    easiness = max(1.3, state.easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ReviewState(
+        state.card_id, state.certification, state.domain, state.question, state.answer,
+        easiness=easiness, interval_days=interval_days, repetitions=repetitions,
+        due_at=now + interval_days * DAY_SECONDS, reviewed_at=now
+    )
+
+
+class ReviewScheduler:
+    """
+    Due queue for one learner's cards, kept as a min-heap on due time.
+
+    Rescheduling pushes a new heap entry instead of searching for the old one;
+    outdated entries are skipped when they reach the top. Picking and
+    rescheduling are therefore O(log n) regardless of how many cards there are.
+    """
+
+    def __init__(self, states: Iterable[ReviewState] = ()):
+        self._states: Dict[str, ReviewState] = {state.card_id: state for state in states}
+        self._heap: List[Tuple[float, str]] = [(state.due_at, state.card_id) for state in self._states.values()]
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, card_id: str) -> bool:
+        return card_id in self._states
+
+    def add(self, state: ReviewState) -> bool:
+        """Start scheduling a card; returns False if it was already known."""
+        if state.card_id in self._states:
+            return False
+        self._states[state.card_id] = state
+        heapq.heappush(self._heap, (state.due_at, state.card_id))
+        return True
+
+    def _discard_outdated(self) -> None:
+        while self._heap:
+            due_at, card_id = self._heap[0]
+            if self._states[card_id].due_at == due_at:
+                return
+            heapq.heappop(self._heap)
+
+    def peek(self) -> Optional[ReviewState]:
+        """The card with the earliest due time, due or not."""
+        self._discard_outdated()
+        if not self._heap:
+            return None
+        return self._states[self._heap[0][1]]
+
+    def next_due(self, now: Optional[float] = None) -> Optional[ReviewState]:
+        """The most overdue card, or None if nothing is due yet."""
+        state = self.peek()
+        now = now if now is not None else time.time()
+        return state if state is not None and state.due_at <= now else None
+
+    def review(self, card_id: str, quality: int, now: Optional[float] = None) -> ReviewState:
+        """Grade a card and reschedule it. Returns the new state for persisting."""
+        state = sm2(self._states[card_id], quality, now)
+        self._states[card_id] = state
+        heapq.heappush(self._heap, (state.due_at, card_id))
+        # Drop accumulated outdated entries once they outnumber the live ones
+        if len(self._heap) > 2 * len(self._states) + 16:
+            self._heap = [(s.due_at, s.card_id) for s in self._states.values()]
+            heapq.heapify(self._heap)
+        return state
@@ -0,0 +1,68 @@
+import pytest
+
+from dedup import NearDuplicateIndex, jaccard, shingles
+
+QUESTION = "Which AWS service provides managed relational databases in the cloud?"
+
+
+def test_shingles_ignore_case_punctuation_and_stopwords():
+    assert shingles("What is the Amazon S3 storage class?") == shingles("amazon s3 STORAGE class")
+    assert shingles("What is S3?") == {"s3"}
+    assert shingles("What is the?") == set()
+
+
+def test_jaccard():
+    assert jaccard({"a", "b"}, {"b", "c"}) == pytest.approx(1 / 3)
+    assert jaccard(set(), set()) == 1.0
+
+
+def test_exact_and_reworded_duplicates_are_rejected():
+    index = NearDuplicateIndex()
+    assert index.add(QUESTION)
+    assert not index.add(QUESTION)
+    assert not index.add("Which AWS service provides managed relational databases in the cloud")
+    assert not index.add("WHICH aws service provides managed relational databases in the cloud?!")
+    assert len(index) == 1
+
+
+def test_distinct_questions_are_added():
+    index = NearDuplicateIndex()
+    questions = [
+        QUESTION,
+        "What is the maximum size of a single object stored in Amazon S3?",
+        "How does AWS Lambda bill for function execution time?",
+        "Which IAM entity should an EC2 instance use to call other AWS services?",
+    ]
+    assert all(index.add(question) for question in questions)
+    assert len(index) == len(questions)
+
+
+def test_is_duplicate_does_not_add():
+    index = NearDuplicateIndex()
+    index.add(QUESTION)
+    assert index.is_duplicate(QUESTION)
+    assert not index.is_duplicate("How does AWS Lambda bill for function execution time?")
+    assert len(index) == 1
+
+
+def test_force_adds_a_duplicate():
+    index = NearDuplicateIndex()
+    index.add(QUESTION)
+    assert index.add(QUESTION, force=True)
+    assert len(index) == 2
+
+
+def test_threshold_controls_what_counts_as_a_duplicate():
+    # Shares 5 of QUESTION's 6 shingles
+    variant = "Which AWS service provides managed relational databases?"
+    assert jaccard(shingles(QUESTION), shingles(variant)) == pytest.approx(5 / 6)
+    lenient, strict = NearDuplicateIndex(threshold=0.6), NearDuplicateIndex(threshold=0.9)
+    lenient.add(QUESTION)
+    strict.add(QUESTION)
+    assert lenient.is_duplicate(variant)
+    assert not strict.is_duplicate(variant)
+
+
+def test_num_perm_must_divide_into_bands():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(num_perm=64, bands=10)
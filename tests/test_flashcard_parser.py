@@ -0,0 +1,66 @@
+import pytest
+
+from gemini_service import FlashcardParser, parse_flashcards
+
+RESPONSE = (
+    "Here are your cards:\n"
+    "Q: What does S3 stand for?\n"
+    "A: Simple Storage Service\n"
+    "\n"
+    "Q: Which service runs containers without servers?\n"
+    "A: AWS Fargate\n"
+)
+CARDS = [
+    {"question": "What does S3 stand for?", "answer": "Simple Storage Service"},
+    {"question": "Which service runs containers without servers?", "answer": "AWS Fargate"},
+]
+
+
+def feed_in_chunks(text, size):
+    parser = FlashcardParser()
+    cards = []
+    for start in range(0, len(text), size):
+        cards += parser.feed(text[start:start + size])
+    return cards + parser.close()
+
+
+def test_parses_a_complete_response():
+    assert parse_flashcards(RESPONSE) == CARDS
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 13, 64])
+def test_chunk_boundaries_do_not_change_the_cards(size):
+    # Small sizes split "Q:"/"A:" markers and the text after them across chunks
+    assert feed_in_chunks(RESPONSE, size) == CARDS
+
+
+def test_card_is_returned_once_its_answer_line_ends():
+    parser = FlashcardParser()
+    assert parser.feed("Q: What is IAM?\nA: Identity and") == []
+    assert parser.feed(" Access Management") == []
+    assert parser.feed("\nQ: Next") == [{"question": "What is IAM?", "answer": "Identity and Access Management"}]
+
+
+def test_close_flushes_an_unterminated_last_answer():
+    parser = FlashcardParser()
+    assert parser.feed("Q: What is EC2?\nA: Elastic Compute Cloud") == []
+    assert parser.close() == [{"question": "What is EC2?", "answer": "Elastic Compute Cloud"}]
+    assert parser.close() == []
+
+
+def test_close_drops_a_question_without_an_answer():
+    parser = FlashcardParser()
+    parser.feed("Q: What is EC2?\nA: Elastic Compute Cloud\nQ: Unanswered")
+    assert parser.close() == []
+
+
+def test_answer_without_a_question_is_ignored():
+    assert parse_flashcards("A: orphan\nQ: What is RDS?\nA: Relational Database Service") == [
+        {"question": "What is RDS?", "answer": "Relational Database Service"}
+    ]
+
+
+def test_surrounding_whitespace_is_stripped():
+    assert parse_flashcards("  Q:   What is VPC?  \r\n\tA:  Virtual Private Cloud \r\n") == [
+        {"question": "What is VPC?", "answer": "Virtual Private Cloud"}
+    ]
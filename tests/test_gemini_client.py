@@ -0,0 +1,205 @@
+import asyncio
+
+import pytest
+
+import gemini_client
+from gemini_client import (
+    CircuitBreaker, CircuitOpenError, GenerationError, RateLimitDeferred, ResilientModel, TokenBucket,
+    background_calls, is_retryable
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(gemini_client.time, "monotonic", clock)
+    return clock
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+class InvalidArgument(Exception):
+    code = 400
+
+
+class QuotaError(Exception):
+    code = 429
+
+
+class ScriptedModel:
+    """Raises or returns the scripted outcomes in order, one per call."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+
+def resilient(model, **kwargs):
+    kwargs.setdefault("base_delay", 0.0)
+    return ResilientModel(model, **kwargs)
+
+
+@pytest.mark.parametrize("error", [
+    QuotaError(), ServiceUnavailable(), TimeoutError(), ConnectionError(),
+    GenerationError("overloaded", retryable=True),
+])
+def test_transient_errors_are_retryable(error):
+    assert is_retryable(error)
+
+
+@pytest.mark.parametrize("error", [
+    InvalidArgument(), ValueError("bad prompt"), GenerationError("blocked", retryable=False),
+])
+def test_request_errors_are_not_retryable(error):
+    assert not is_retryable(error)
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_a_single_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_half_open_trial_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_half_open_trial_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 29
+    assert not breaker.allow()
+
+
+def test_release_frees_the_trial_slot(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.allow()
+
+
+def test_retries_transient_errors_then_succeeds():
+    model = ScriptedModel(ServiceUnavailable(), QuotaError(), "ok")
+    assert resilient(model, max_retries=3).generate_content("prompt") == "ok"
+    assert model.calls == 3
+
+
+def test_gives_up_after_max_retries():
+    model = ScriptedModel(*[ServiceUnavailable()] * 3)
+    with pytest.raises(GenerationError) as excinfo:
+        resilient(model, max_retries=2, circuit_breaker=CircuitBreaker(failure_threshold=10)).generate_content("prompt")
+    assert excinfo.value.retryable
+    assert isinstance(excinfo.value.__cause__, ServiceUnavailable)
+    assert model.calls == 3
+
+
+def test_bad_request_is_not_retried_and_does_not_trip_breaker():
+    breaker = CircuitBreaker(failure_threshold=1)
+    model = ScriptedModel(InvalidArgument(), "ok")
+    wrapped = resilient(model, circuit_breaker=breaker)
+    with pytest.raises(GenerationError) as excinfo:
+        wrapped.generate_content("prompt")
+    assert not excinfo.value.retryable
+    assert model.calls == 1
+    assert breaker.state == "closed"
+    assert wrapped.generate_content("prompt") == "ok"
+
+
+def test_open_breaker_fails_fast_without_calling_model(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    model = ScriptedModel(ServiceUnavailable(), ServiceUnavailable(), "ok")
+    wrapped = resilient(model, circuit_breaker=breaker, max_retries=5)
+    # The breaker opens mid-retry, which stops the retries
+    with pytest.raises(GenerationError):
+        wrapped.generate_content("prompt")
+    assert model.calls == 2
+    with pytest.raises(CircuitOpenError):
+        wrapped.generate_content("prompt")
+    assert model.calls == 2
+    clock.now += 30
+    assert wrapped.generate_content("prompt") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_async_calls_share_the_retry_policy():
+    model = ScriptedModel(QuotaError(), "ok")
+    assert asyncio.run(resilient(model).generate_content_async("prompt")) == "ok"
+    assert model.calls == 2
+
+    model = ScriptedModel(InvalidArgument())
+    with pytest.raises(GenerationError) as excinfo:
+        asyncio.run(resilient(model).generate_content_async("prompt"))
+    assert not excinfo.value.retryable
+    assert model.calls == 1
+
+
+def test_rate_limiter_timeout_is_retryable():
+    bucket = TokenBucket(rate=0.001, capacity=1)
+    bucket.acquire()
+    model = ScriptedModel("ok")
+    with pytest.raises(GenerationError) as excinfo:
+        resilient(model, rate_limiter=bucket, rate_limit_timeout=0.01).generate_content("prompt")
+    assert excinfo.value.retryable
+    assert model.calls == 0
+
+
+def test_background_calls_leave_the_reserve():
+    bucket = TokenBucket(rate=0.001, capacity=3)
+    model = ScriptedModel("ok", "ok")
+    wrapped = resilient(model, rate_limiter=bucket)
+    with background_calls(reserve=2):
+        assert wrapped.generate_content("prompt") == "ok"
+        with pytest.raises(RateLimitDeferred):
+            wrapped.generate_content("prompt")
+    # Foreground calls may still use the reserved tokens
+    assert wrapped.generate_content("prompt") == "ok"
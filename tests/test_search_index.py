@@ -0,0 +1,84 @@
+import pytest
+
+from search_index import CardSearchIndex, tokenize
+
+STORAGE = [
+    {"question": "What is Amazon S3?", "answer": "Object storage with eleven nines of durability"},
+    {"question": "How is data encrypted at rest in S3?",
+     "answer": "With S3 managed keys, KMS keys or customer keys; encryption encryption"},
+    {"question": "What is Amazon EBS?", "answer": "Block storage volumes for EC2 instances"},
+]
+SECURITY = [
+    {"question": "What does AWS KMS do?", "answer": "Creates and controls encryption keys"},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = CardSearchIndex(str(tmp_path / "search.sqlite3"))
+    index.add_cards("AWS", "Storage", STORAGE)
+    index.add_cards("AWS", "Security", SECURITY)
+    return index
+
+
+def questions(results):
+    return [result["question"] for result in results]
+
+
+def test_tokenize_drops_case_punctuation_and_stopwords():
+    assert tokenize("What is the S3 Storage-Class?") == ["s3", "storage", "class"]
+
+
+def test_higher_term_frequency_ranks_first(index):
+    assert questions(index.search("encryption")) == [
+        "How is data encrypted at rest in S3?", "What does AWS KMS do?"
+    ]
+
+
+def test_rarer_terms_weigh_more(index):
+    # "storage" is in two cards, "block" in one: the card with both comes first
+    results = index.search("block storage")
+    assert results[0]["question"] == "What is Amazon EBS?"
+    assert results[0]["score"] > results[1]["score"]
+
+
+def test_results_carry_the_card_and_its_deck(index):
+    [result] = index.search("durability")
+    assert result == dict(STORAGE[0], certification="AWS", domain="Storage", score=result["score"])
+
+
+def test_limit_and_certification_filter(index, tmp_path):
+    assert len(index.search("storage encryption keys", limit=1)) == 1
+    index.add_cards("Azure", "Storage", [{"question": "What is Blob Storage?", "answer": "Object storage"}])
+    assert questions(index.search("blob storage", certification="Azure")) == ["What is Blob Storage?"]
+    assert "What is Blob Storage?" not in questions(index.search("blob storage", certification="AWS"))
+
+
+def test_no_matches(index):
+    assert index.search("kubernetes") == []
+    assert index.search("what is the") == []
+
+
+def test_add_cards_only_indexes_new_cards(index):
+    assert index.add_cards("AWS", "Storage", STORAGE) == 0
+    grown = STORAGE + [{"question": "What is S3 Glacier?", "answer": "Archive storage"}]
+    assert index.add_cards("AWS", "Storage", grown) == 1
+    # The same question in another domain is a different card
+    assert index.add_cards("AWS", "Archive", grown[-1:]) == 1
+
+
+def test_cards_added_after_a_search_are_found(index):
+    assert index.search("glacier") == []
+    index.add_cards("AWS", "Storage", [{"question": "What is S3 Glacier?", "answer": "Archive storage"}])
+    assert questions(index.search("glacier")) == ["What is S3 Glacier?"]
+
+
+def test_picks_up_cards_indexed_by_another_process(index, tmp_path):
+    index.search("storage")
+    other = CardSearchIndex(str(tmp_path / "search.sqlite3"))
+    other.add_cards("AWS", "Compute", [{"question": "What is AWS Lambda?", "answer": "Serverless functions"}])
+    assert questions(index.search("serverless")) == ["What is AWS Lambda?"]
+    # The other index loads everything on its first search, not when it is created
+    assert len(other) == 0
+    assert len(other.search("storage")) == 2
+    assert len(other) == 5
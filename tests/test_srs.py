@@ -0,0 +1,118 @@
+import pytest
+
+from srs import DAY_SECONDS, ReviewScheduler, ReviewState, card_id, sm2
+
+NOW = 1_000_000.0
+
+
+def state(question="What is S3?", due_at=NOW, **kwargs):
+    return ReviewState(card_id("AWS", "Storage", question), "AWS", "Storage", question, "Object storage",
+                       due_at=due_at, **kwargs)
+
+
+def review(initial, *qualities, now=NOW):
+    for quality in qualities:
+        initial = sm2(initial, quality, now)
+    return initial
+
+
+def test_card_id_is_stable_and_ignores_surrounding_whitespace():
+    assert card_id("AWS", "Storage", "What is S3?") == card_id("AWS", "Storage", "  What is S3?\n")
+    assert card_id("AWS", "Storage", "What is S3?") != card_id("AWS", "Compute", "What is S3?")
+
+
+def test_new_card_is_due_immediately():
+    new = ReviewState.new("AWS", "Storage", {"question": "What is S3?", "answer": "Object storage"}, now=NOW)
+    assert new.due_at == NOW
+    assert (new.easiness, new.interval_days, new.repetitions) == (2.5, 0.0, 0)
+
+
+def test_intervals_grow_one_six_then_by_easiness():
+    after = [review(state(), *[4] * n) for n in (1, 2, 3, 4)]
+    assert [s.interval_days for s in after] == [1.0, 6.0, 15.0, 37.5]
+    assert [s.repetitions for s in after] == [1, 2, 3, 4]
+
+
+def test_due_time_follows_the_interval():
+    reviewed = review(state(), 4, 4, now=NOW)
+    assert reviewed.due_at == NOW + 6 * DAY_SECONDS
+    assert reviewed.reviewed_at == NOW
+
+
+@pytest.mark.parametrize("quality, change", [(5, 0.1), (4, 0.0), (3, -0.14), (1, -0.54), (0, -0.8)])
+def test_easiness_change_per_grade(quality, change):
+    assert sm2(state(), quality, NOW).easiness == pytest.approx(2.5 + change)
+
+
+def test_easiness_never_drops_below_floor():
+    assert review(state(), 0, 0, 0, 0).easiness == 1.3
+
+
+def test_failed_review_restarts_repetitions_but_keeps_easiness():
+    learned = review(state(), 5, 5, 5)
+    lapsed = sm2(learned, 2, NOW)
+    assert (lapsed.repetitions, lapsed.interval_days) == (0, 1.0)
+    assert lapsed.easiness == pytest.approx(learned.easiness - 0.32)
+    assert sm2(lapsed, 4, NOW).interval_days == 1.0
+
+
+def test_sm2_returns_a_new_state():
+    original = state()
+    sm2(original, 5, NOW)
+    assert (original.repetitions, original.easiness) == (0, 2.5)
+
+
+def test_scheduler_returns_the_most_overdue_card():
+    scheduler = ReviewScheduler([
+        state("Q1", due_at=NOW - 10), state("Q2", due_at=NOW - 100), state("Q3", due_at=NOW + 100),
+    ])
+    assert scheduler.next_due(NOW).question == "Q2"
+    assert scheduler.peek().question == "Q2"
+
+
+def test_scheduler_has_nothing_due_before_the_earliest_card():
+    scheduler = ReviewScheduler([state("Q1", due_at=NOW + 100)])
+    assert scheduler.next_due(NOW) is None
+    assert scheduler.peek().question == "Q1"
+    assert scheduler.next_due(NOW + 100).question == "Q1"
+
+
+def test_reviewed_card_moves_behind_cards_still_due():
+    first, second = state("Q1", due_at=NOW - 100), state("Q2", due_at=NOW - 10)
+    scheduler = ReviewScheduler([first, second])
+    reviewed = scheduler.review(first.card_id, 4, NOW)
+    assert reviewed.due_at == NOW + DAY_SECONDS
+    assert scheduler.next_due(NOW).question == "Q2"
+    scheduler.review(second.card_id, 5, NOW)
+    assert scheduler.next_due(NOW) is None
+    assert scheduler.next_due(NOW + DAY_SECONDS).question == "Q1"
+
+
+def test_add_ignores_known_cards():
+    scheduler = ReviewScheduler()
+    assert scheduler.add(state("Q1"))
+    assert not scheduler.add(state("Q1", due_at=NOW + 100))
+    assert len(scheduler) == 1
+    assert state("Q1").card_id in scheduler
+    assert scheduler.peek().due_at == NOW
+
+
+def test_order_holds_after_many_reschedules():
+    # Enough reviews to trigger the compaction of outdated heap entries
+    cards = [state(f"Q{i}", due_at=NOW + i) for i in range(5)]
+    scheduler = ReviewScheduler(cards)
+    for round_number in range(20):
+        for i, card in enumerate(cards):
+            scheduler.review(card.card_id, 1, NOW + round_number * 10 + i)
+    assert scheduler.peek().question == "Q0"
+    due = []
+    while (current := scheduler.next_due(NOW + 10 * DAY_SECONDS)) is not None:
+        due.append(current.question)
+        scheduler.review(current.card_id, 5, NOW + 10 * DAY_SECONDS)
+    assert due == [f"Q{i}" for i in range(5)]
+
+
+def test_empty_scheduler():
+    scheduler = ReviewScheduler()
+    assert scheduler.peek() is None
+    assert scheduler.next_due(NOW) is None